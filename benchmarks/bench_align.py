@@ -0,0 +1,75 @@
+"""Compare iterative outer merges with single-pass alignment.
+
+Usage:
+    python benchmarks/bench_align.py [--years 40] [--repeat 3]
+
+Builds synthetic daily histories for 2, 10 and 50 indicators, with staggered
+start dates and random gaps, and times both approaches end to end (records
+output) plus the alignment alone (frame output).
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from openbb_dbnomics.utils.alignment import align_series  # noqa: E402
+
+
+def synthetic(n_series, years, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.date_range("1980-01-01", periods=int(years * 365.25), freq="D").strftime("%Y-%m-%d")
+    series = {}
+    for i in range(n_series):
+        start = rng.integers(0, len(days) // 4)
+        keep = rng.random(len(days) - start) > 0.05  # ~5% missing days
+        periods = days[start:][keep].tolist()
+        values = rng.normal(100, 10, len(periods)).round(3).tolist()
+        series[f"IND{i}"] = (periods, values)
+    return series
+
+
+def merge_loop(series):
+    """The previous approach: one outer merge per indicator, then a sort."""
+    dfs = [pd.DataFrame({"date": periods, name: values}) for name, (periods, values) in series.items()]
+    merged = dfs[0]
+    for df in dfs[1:]:
+        merged = pd.merge(merged, df, on="date", how="outer")
+    return merged.sort_values("date")
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'indicators':>10} {'periods':>8} {'merge ms':>9} {'align ms':>9} "
+          f"{'speedup':>8} {'merge+rec':>10} {'align+rec':>10}")
+    for n_series in (2, 10, 50):
+        series = synthetic(n_series, args.years)
+        merge = best_of(lambda: merge_loop(series), args.repeat)
+        align = best_of(lambda: align_series(series).to_frame(), args.repeat)
+        merge_records = best_of(lambda: merge_loop(series).to_dict(orient="records"), args.repeat)
+        align_records = best_of(lambda: align_series(series).to_records(), args.repeat)
+        n_periods = len(align_series(series))
+        print(f"{n_series:>10} {n_periods:>8} {merge * 1e3:9.1f} {align * 1e3:9.1f} "
+              f"{merge / align:7.1f}x {merge_records * 1e3:10.1f} {align_records * 1e3:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
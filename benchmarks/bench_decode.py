@@ -0,0 +1,136 @@
+"""Compare JSON decoder backends on DBnomics-sized payloads.
+
+Usage:
+    python benchmarks/bench_decode.py            # recorded payloads, else synthetic
+    python benchmarks/bench_decode.py --record   # download payloads first
+
+Recorded payloads live in benchmarks/payloads/<kind>__<name>.json; the kind
+prefix (series, observations, metadata, ...) selects the decoder schema.
+Reports the best decode time and the tracemalloc peak for each backend.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from openbb_dbnomics.utils.decoding import JSONDecoder  # noqa: E402
+
+PAYLOAD_DIR = Path(__file__).parent / "payloads"
+BASE_URL = "https://api.db.nomics.world/v22"
+RECORD = {
+    "series__imf_ifs_1000": ("/series/IMF/IFS", {"limit": 1000, "offset": 0}),
+    "metadata__imf_ifs": ("/datasets/IMF/IFS", {}),
+    "observations__imf_weo": ("/series/IMF/WEO:latest", {"limit": 1000, "observations": 1}),
+}
+
+
+def record():
+    import requests
+
+    PAYLOAD_DIR.mkdir(exist_ok=True)
+    for name, (path, params) in RECORD.items():
+        response = requests.get(BASE_URL + path, params={"format": "json", **params}, timeout=120)
+        response.raise_for_status()
+        (PAYLOAD_DIR / f"{name}.json").write_bytes(response.content)
+        print(f"recorded {name}: {len(response.content) / 1e6:.1f} MB")
+
+
+def synthetic_series(n_docs=10000, n_obs=0):
+    rng = random.Random(0)
+    docs = []
+    for i in range(n_docs):
+        doc = {
+            "provider_code": "IMF",
+            "dataset_code": "IFS",
+            "dataset_name": "International Financial Statistics",
+            "series_code": f"M.C{i % 200}.IND{i}",
+            "series_name": f"Monthly - Country {i % 200} - Indicator {i}",
+            "indexed_at": "2024-01-01T00:00:00.000Z",
+            "dimensions": {"FREQ": "M", "REF_AREA": f"C{i % 200}", "INDICATOR": f"IND{i}"},
+            "@frequency": "monthly",
+        }
+        if n_obs:
+            doc["period"] = [f"{2000 + m // 12}-{m % 12 + 1:02d}" for m in range(n_obs)]
+            doc["period_start_day"] = [f"{p}-01" for p in doc["period"]]
+            doc["value"] = [round(rng.uniform(-10, 10), 4) for _ in range(n_obs)]
+            doc["observations_attributes"] = [["OBS_STATUS", ""]] * n_obs
+        docs.append(doc)
+    return {"series": {"docs": docs, "num_found": n_docs, "offset": 0, "limit": n_docs},
+            "dataset": {"code": "IFS", "name": "International Financial Statistics"}}
+
+
+def synthetic_metadata(n_values=20000):
+    labels = {f"IND{i}": f"Indicator number {i} with a long descriptive label" for i in range(n_values)}
+    areas = {f"C{i}": f"Country {i}" for i in range(250)}
+    return {"datasets": {"docs": [{
+        "code": "IFS",
+        "dimensions_codes_order": ["FREQ", "REF_AREA", "INDICATOR"],
+        "dimensions_values_labels": {"FREQ": {"A": "Annual", "M": "Monthly"},
+                                     "REF_AREA": areas, "INDICATOR": labels},
+    }]}}
+
+
+def load_payloads():
+    payloads = {}
+    for path in sorted(PAYLOAD_DIR.glob("*.json")):
+        payloads[path.stem] = path.read_bytes()
+    if not payloads:
+        payloads = {
+            "series__synthetic_10000": json.dumps(synthetic_series()).encode(),
+            "observations__synthetic_500x240": json.dumps(synthetic_series(500, 240)).encode(),
+            "metadata__synthetic": json.dumps(synthetic_metadata()).encode(),
+        }
+    return payloads
+
+
+def measure(decoder, body, kind, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = decoder.decode(body, kind)
+        best = min(best, time.perf_counter() - start)
+        del data
+    tracemalloc.start()
+    data = decoder.decode(body, kind)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="download payloads first")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.record:
+        record()
+
+    decoders = []
+    for backend in JSONDecoder.BACKENDS:
+        try:
+            decoders.append(JSONDecoder(backend))
+        except ImportError:
+            print(f"({backend} not installed, skipped)")
+
+    print(f"{'payload':36} {'MB':>6} {'backend':>8} {'ms':>9} {'peak MB':>8} {'vs json':>8}")
+    for name, body in load_payloads().items():
+        kind = name.split("__", 1)[0]
+        baseline = None
+        for decoder in reversed(decoders):  # stdlib first, as the baseline
+            seconds, peak = measure(decoder, body, kind, args.repeat)
+            if decoder.backend == "json":
+                baseline = seconds
+            speedup = f"{baseline / seconds:.1f}x" if baseline else "-"
+            print(f"{name:36} {len(body) / 1e6:6.1f} {decoder.backend:>8} "
+                  f"{seconds * 1e3:9.1f} {peak / 1e6:8.1f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
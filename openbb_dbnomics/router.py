@@ -8,16 +8,25 @@ from openbb_core.app.provider_interface import (ExtraParams, ProviderChoices,
 from openbb_core.app.query import Query
 from openbb_core.app.router import Router
 from pydantic import BaseModel, create_model, Field
-from fastapi import Query
+from fastapi import Header, Query
 from openbb_dbnomics.utils.providers import DBNomicsClient
 from fastapi.middleware.cors import CORSMiddleware
-import re
 from openbb_core.provider.abstract.data import Data  # Use this as base for OpenBB compatibility
+from openbb_dbnomics.utils.chartspec import FIGURE_CHARTS, chart_payload, figure_payload
+from openbb_dbnomics.utils.downsample import METHODS as DOWNSAMPLE_METHODS
+from openbb_dbnomics.utils.ndjson import ndjson_response, wants_ndjson
+from openbb_dbnomics.utils.formats import BINARY_FORMATS, FORMATS, MEDIA_TYPES, encode_frame
 from openbb_dbnomics.utils.myplot import plot_ts
+from openbb_dbnomics.utils.pagination import decode_cursor, encode_cursor
+from openbb_dbnomics.utils.periods import period_bounds
+from openbb_dbnomics.utils.transforms import TRANSFORMS, transform, validate_change
 import pandas as pd
+from fastapi import Response
 from fastapi.responses import JSONResponse
 import json
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 import numpy as np
 from openbb_dbnomics.dashboard import router as dashboard_router
 
@@ -25,51 +34,141 @@ from openbb_dbnomics.dashboard import router as dashboard_router
 router = Router(prefix="")
 # API router for endpoints
 api_router = Router(prefix="")
+# Shared client so every endpoint reuses the same pooled upstream connections
 client = DBNomicsClient()
 
 # Include dashboard router in the API router
 api_router.include_router(dashboard_router, prefix="/dashboard")
 
+@api_router.api_router.get("/stats", tags=["Diagnostics"])
+def get_client_stats():
+    """Upstream transport counters for the shared DBNomics client."""
+    return client.stats()
+
 @api_router.api_router.get("/providers", tags=["Providers"])
 def get_providers():
-    client = DBNomicsClient()
     return client.get_providers()
 
 @api_router.api_router.get("/datasets", tags=["Datasets"])
-def get_datasets(search: str = Query(..., description="Search term for datasets")):
-    client = DBNomicsClient()
+def get_datasets(
+    search: str = Query(..., description="Search term for datasets"),
+    accept: str = Header(None)
+):
+    if wants_ndjson(accept):
+        # One dataset per line, written as the search response is parsed
+        return ndjson_response(client.iter_datasets(search_term=search))
     return client.get_datasets(search_term=search)
 
+def _parse_dimensions(dimensions):
+    """Parse the ``dimensions`` query param into a {dimension: [values]} dict.
+
+    Each dimension maps to a string or a list of strings; anything else
+    raises ValueError.
+    """
+    if not dimensions:
+        return {}
+    parsed = json.loads(dimensions)
+    if not isinstance(parsed, dict):
+        raise ValueError("dimensions must be a JSON object")
+    for dimension, values in parsed.items():
+        if isinstance(values, str):
+            continue
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"values of {dimension!r} must be a string or a list of strings")
+    return parsed
+
 @api_router.api_router.get("/series", tags=["Series"])
 def get_series(
     provider: str = Query(..., description="Provider code, e.g., 'IMF'"),
     dataset: str = Query(..., description="Dataset code, e.g., 'IFS'"),
-    name_filter: str = Query(None, description="Filter by substring in series_name"),
+    name_filter: str = Query(None, description="Full-text filter on series, applied by DBnomics"),
+    ref_area: str = Query(None, description="Filter by REF_AREA code (e.g., 'US')"),
+    dimensions: str = Query(None, description='Dimension filters as JSON, e.g. {"FREQ": ["Q"], "INDICATOR": ["NGDP_SA_XDC"]}'),
+    limit: int = Query(100, description="Max number of series to return"),
+    offset: int = Query(0, description="Number of matching series to skip"),
+    cursor: str = Query(None, description="Cursor from a previous page's X-Next-Cursor header"),
+    page_size: int = Query(None, description="Series per page when paginating with cursors"),
+    accept: str = Header(None),
+    response: Response = None
+):
+    try:
+        dimension_filters = _parse_dimensions(dimensions)
+    except ValueError as exc:
+        return JSONResponse({"error": f"Invalid dimensions filter: {exc}"}, status_code=400)
+    if cursor is not None or page_size is not None:
+        # Cursor mode: walk the listing lazily and hand back one page
+        try:
+            start = decode_cursor(cursor) if cursor else offset
+        except ValueError:
+            return JSONResponse({"error": "Invalid cursor."}, status_code=400)
+        page_size = max(1, min(page_size or limit, DBNomicsClient.SERIES_PAGE_MAX))
+        page = list(client.iter_series(
+            provider, dataset, page_size=page_size, offset=start, limit=page_size,
+            ref_area=ref_area, dimensions=dimension_filters, q=name_filter,
+        ))
+        headers = {"X-Next-Cursor": encode_cursor(start + page_size)} if len(page) == page_size else {}
+        if wants_ndjson(accept):
+            return ndjson_response(page, headers=headers)
+        response.headers.update(headers)
+        return page
+    if wants_ndjson(accept):
+        # One series per line as each page arrives; filters are pushed upstream
+        return ndjson_response(client.iter_series(
+            provider, dataset, page_size=min(limit, DBNomicsClient.SERIES_PAGE_MAX), offset=offset,
+            limit=limit, ref_area=ref_area, dimensions=dimension_filters, q=name_filter,
+        ))
+    # Filters are pushed upstream so only the requested page is downloaded
+    return client.get_series(
+        provider_code=provider,
+        dataset_code=dataset,
+        limit=limit,
+        offset=offset,
+        ref_area=ref_area,
+        dimensions=dimension_filters,
+        q=name_filter,
+    )
+
+@api_router.api_router.get("/series/facets", tags=["Series"])
+def get_series_facets(
+    provider: str = Query(..., description="Provider code, e.g., 'IMF'"),
+    dataset: str = Query(..., description="Dataset code, e.g., 'IFS'"),
     ref_area: str = Query(None, description="Filter by REF_AREA code (e.g., 'US')"),
-    limit: int = Query(100, description="Max number of series to return")
+    dimensions: str = Query(None, description='Dimension filters as JSON; values within a dimension are ORed, dimensions ANDed'),
+    limit: int = Query(100, description="Max number of matching series to return"),
+    offset: int = Query(0, description="Number of matching series to skip"),
 ):
-    client = DBNomicsClient()
-    # Fetch a large batch of series (API does not support dimension filtering)
-    series = client.get_series(provider_code=provider, dataset_code=dataset, limit=10000)
-    # Filter by REF_AREA code if provided
-    if ref_area:
-        series = [s for s in series if s.get("REF_AREA") == ref_area]
-    # Filter by name_filter if provided
-    if name_filter:
-        series = [s for s in series if name_filter.lower() in s.get("series_name", "").lower()]
-    # Apply limit
-    series = series[:limit]
-    # After fetching series
-    ref_areas = set(s.get("REF_AREA") for s in series if "REF_AREA" in s)
-    # print("Unique REF_AREA codes in first 10,000:", ref_areas)
-    return series
+    """Series matching the dimension filters, with per-value counts for every dimension."""
+    try:
+        dimension_filters = _parse_dimensions(dimensions)
+    except ValueError as exc:
+        return JSONResponse({"error": f"Invalid dimensions filter: {exc}"}, status_code=400)
+    index = client.get_facet_index(provider, dataset)
+    if index is None:
+        return JSONResponse(
+            {"error": "Dataset is too large to facet; filter it with /series instead."}, status_code=400
+        )
+    positions, counts = index.query(ref_area=ref_area, dimensions=dimension_filters)
+    labels = client.get_dataset_metadata(provider, dataset).get("dimensions_values_labels", {})
+    facets = {}
+    for dim, value_counts in counts.items():
+        names = labels.get(dim, {})
+        facets[dim] = [
+            {"code": code, "name": names.get(code, code), "count": count}
+            for code, count in sorted(value_counts.items(), key=lambda item: -item[1])
+        ]
+    page = positions[offset:offset + limit]
+    return {
+        "total": index.size,
+        "count": len(positions),
+        "facets": facets,
+        "series": index.listing.take(page).to_records(),
+    }
 
 @api_router.api_router.get("/series/ref_areas", tags=["Series"])
 def get_ref_areas(
     provider: str = Query(..., description="Provider code, e.g., 'IMF'"),
     dataset: str = Query(..., description="Dataset code, e.g., 'IFS'")
 ):
-    client = DBNomicsClient()
     metadata = client.get_dataset_metadata(provider, dataset)
     dimensions = metadata.get("dimensions_values_labels", {})
     ref_area_dict = dimensions.get("REF_AREA", {})
@@ -82,7 +181,6 @@ def get_indicators(
     provider: str = Query(..., description="Provider code, e.g., 'IMF'"),
     dataset: str = Query(..., description="Dataset code, e.g., 'IFS'")
 ):
-    client = DBNomicsClient()
     metadata = client.get_dataset_metadata(provider, dataset)
     dimensions = metadata.get("dimensions_values_labels", {})
     indicator_dict = dimensions.get("INDICATOR", {})
@@ -90,25 +188,89 @@ def get_indicators(
     indicators = sorted(indicators, key=lambda x: x["name"])
     return indicators
 
+def _fetch_aligned(response, *args, **kwargs):
+    """Fetch aligned series, flagging the response if any part was served stale."""
+    with client.track_staleness() as stale:
+        records = client.get_multi_series_aligned(*args, **kwargs)
+    if stale and response is not None:
+        response.headers["X-DBnomics-Stale"] = "true"
+    return records
+
+def _format_response(df, fmt, response=None):
+    """Response holding the aligned frame ``df`` in a columnar format (see utils.formats)."""
+    try:
+        body = encode_frame(df, fmt)
+    except ImportError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=501)
+    if fmt in BINARY_FORMATS:
+        result = Response(body, media_type=MEDIA_TYPES[fmt])
+    else:
+        result = JSONResponse(body)
+    # A returned Response replaces the injected one, so carry the stale flag over
+    if response is not None and "X-DBnomics-Stale" in response.headers:
+        result.headers["X-DBnomics-Stale"] = response.headers["X-DBnomics-Stale"]
+    return result
+
 @api_router.api_router.get("/series/table", response_model=list)
 def get_series_table(
     provider: str = Query(...),
     dataset: str = Query(...),
     freq: str = Query(...),
     ref_area: str = Query(...),
-    indicators: str = Query(...)
+    indicators: str = Query(...),
+    change: str = Query("level", description=f"Change type: {', '.join(TRANSFORMS)}"),
+    window: int = Query(None, description="Periods in the rolling mean (change=rolling); defaults to one year"),
+    format: str = Query("records", description=f"Response format: {', '.join(FORMATS)}"),
+    response: Response = None
 ):
+    try:
+        validate_change(change, freq)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    if format not in FORMATS:
+        return JSONResponse({"error": f"Unknown format {format!r}."}, status_code=400)
     indicator_list = [i.strip() for i in indicators.split(",") if i.strip()]
-    records = client.get_multi_series_aligned(provider, dataset, freq, ref_area, indicator_list)
-    # Dynamically build fields for the model
+    if format != "records":
+        # Columnar formats are encoded straight from the aligned frame
+        df = _fetch_aligned(response, provider, dataset, freq, ref_area, indicator_list, output="frame")
+        df = apply_change(df.reindex(columns=indicator_list), change, freq, window)
+        return _format_response(df, format, response)
+    records = _fetch_aligned(response, provider, dataset, freq, ref_area, indicator_list)
+    if not records:
+        return []
+    df = pd.DataFrame(records)
+    if change != "level":
+        df = apply_change(df, change, freq, window)
+    return _table_rows(df, indicator_list)
+
+@lru_cache(maxsize=128)
+def _row_model(indicators):
+    """Row model for a /series/table response, built once per indicator tuple."""
     fields = {
         "date": (str, Field(title="Date", description="Date of observation"))
     }
-    for ind in indicator_list:
-        fields[ind] = (float, Field(title=ind, description=f"{ind} value"))
-    DynamicData = create_model("DynamicData", __base__=Data, **fields)
-    # Convert each record (dict) to a model instance
-    return [DynamicData.model_validate(row) for row in records]
+    for ind in indicators:
+        fields[ind] = (Optional[float], Field(None, title=ind, description=f"{ind} value"))
+    return create_model("DynamicData", __base__=Data, **fields)
+
+def _table_rows(df, indicators):
+    """Serialize an aligned frame to table rows, converting whole columns at once.
+
+    The values are checked as one float matrix (NaN and infinities become
+    None) rather than by a model per row; the first row is then validated
+    against the cached row model, so a schema mismatch still fails loudly.
+    """
+    columns = df.reindex(columns=indicators)
+    values = columns.to_numpy(dtype=np.float64, na_value=np.nan)
+    data = [df["date"].astype(str).tolist()]
+    for j in range(len(indicators)):
+        column = values[:, j]
+        data.append(np.where(np.isfinite(column), column, None).tolist())
+    keys = ["date"] + list(indicators)
+    rows = [dict(zip(keys, row)) for row in zip(*data)]
+    if rows:
+        _row_model(tuple(indicators)).model_validate(rows[0])
+    return rows
 
 @api_router.api_router.get("/series/chart")
 def get_series_chart(
@@ -123,128 +285,79 @@ def get_series_chart(
     source: str = Query("Source: DBNomics", description="Source annotation"),
     theme: str = Query("light", description="Theme: light or dark"),
     startdate: str = Query("1990-01-01", description="Start date for chart (YYYY-MM-DD or YYYY-Qn)"),
-    change: str = Query("level", description="Change type: level, yoy, qoq")
+    enddate: str = Query(None, description="End date for chart (YYYY-MM-DD or YYYY-Qn); defaults to the latest period"),
+    change: str = Query("level", description=f"Change type: {', '.join(TRANSFORMS)}"),
+    window: int = Query(None, description="Periods in the rolling mean (change=rolling); defaults to one year"),
+    max_points: int = Query(None, ge=10, description="Downsample line and bar traces to at most this many points"),
+    downsample: str = Query("minmax", description=f"Downsampling method: {', '.join(DOWNSAMPLE_METHODS)}"),
+    format: str = Query("records", description=f"records for the chart payload, or the charted data as {', '.join(FORMATS[1:])}"),
+    response: Response = None
 ):
+    try:
+        validate_change(change, freq)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    if downsample not in DOWNSAMPLE_METHODS:
+        return JSONResponse({"error": f"Unknown downsampling method {downsample!r}."}, status_code=400)
+    if format not in FORMATS:
+        return JSONResponse({"error": f"Unknown format {format!r}."}, status_code=400)
+    if max_points and format != "records":
+        # Traces are downsampled one by one, which a single table cannot express
+        return JSONResponse(
+            {"error": "max_points only applies to format=records chart payloads."}, status_code=400
+        )
     indicator_list = [i.strip() for i in indicators.split(",") if i.strip()]
-    records = client.get_multi_series_aligned(provider, dataset, freq, ref_area, indicator_list)
+    # The date range is applied while aligning, so only periods inside it
+    # are converted and serialized
+    for label in (startdate, enddate):
+        try:
+            if label:
+                period_bounds(label)
+        except ValueError as exc:
+            return JSONResponse({"error": f"Invalid date: {exc}"}, status_code=400)
+    if format != "records":
+        df = _fetch_aligned(
+            response, provider, dataset, freq, ref_area, indicator_list,
+            output="frame", start=startdate, end=enddate
+        )
+        if df.empty:
+            return JSONResponse({"error": "No data found for the given parameters."}, status_code=404)
+        df = apply_change(df.reindex(columns=indicator_list), change, freq, window)
+        return _format_response(df, format, response)
+    records = _fetch_aligned(
+        response, provider, dataset, freq, ref_area, indicator_list, start=startdate, end=enddate
+    )
     if not records:
         return JSONResponse({"error": "No data found for the given parameters."}, status_code=404)
     df = pd.DataFrame(records)
     if "date" in df.columns:
         df = df.set_index("date")
-        # Filter by startdate (support YYYY-MM-DD and YYYY-Qn)
-        def date_filter(date_str):
-            if re.match(r"^\d{4}-Q\d$", startdate):
-                # Quarterly format
-                return date_str >= startdate
-            else:
-                # Try to parse as date
-                try:
-                    return date_str >= startdate
-                except Exception:
-                    return True
-        df = df[df.index.map(date_filter)]
     
     # Apply change calculations BEFORE plotting
-    df = apply_change(df, change, freq)
+    df = apply_change(df, change, freq, window)
     
     # Update title and y-axis label BEFORE plotting
-    if change == "yoy":
-        nome += " (Year-on-Year % Change)"
-        units = "YoY %"
-    elif change == "qoq":
-        nome += " (Quarter-on-Quarter % Change)"
-        units = "QoQ %"
+    title_suffix, change_units = TRANSFORMS[change]
+    if title_suffix:
+        nome += f" ({title_suffix})"
+    if change_units:
+        units = change_units
+
+    if chart not in FIGURE_CHARTS:
+        # Line and bar payloads are built directly, without a plotly Figure
+        return chart_payload(df, nome=nome, units=units, chart=chart, source=source, theme=theme,
+                             max_points=max_points, method=downsample)
 
     # Clean NaN values for JSON serialization
     df = df.replace([np.inf, -np.inf], np.nan)
     df = df.where(pd.notnull(df), None)
-    
-    # Adjust nticks for xaxis based on number of visible points
-    n_points = len(df)
-    nticks = min(10, max(4, n_points // 20)) if n_points > 0 else 4
-
     fig = plot_ts(df, nome=nome, units=units, chart=chart, source=source, theme=theme)
     # Extract series and layout for OpenBB chart widget
-    series = []
-    for trace in fig.data:
-        if hasattr(trace, 'x') and hasattr(trace, 'y') and trace.x is not None and trace.y is not None:
-            # Clean NaN values from y data before JSON serialization
-            y_clean = []
-            for val in trace.y:
-                if isinstance(val, (int, float)) and (np.isnan(val) or np.isinf(val)):
-                    y_clean.append(None)
-                else:
-                    y_clean.append(val)
-            
-            series.append({
-                "name": getattr(trace, 'name', None) or '',
-                "x": list(trace.x),
-                "y": y_clean,
-                "type": "line"
-            })
-    layout = fig.layout.to_plotly_json()
-    layout_filtered = {
-        "title": {
-            "text": nome,
-            "font": {"size": 22, "color": "#FFFFFF" if theme == "dark" else "#0D1018"},
-            "x": 0.5,  # Center the title
-            "xanchor": "center"
-        },
-        "yaxis": {**layout.get("yaxis", {}), "nticks": 8},
-        "xaxis": {**layout.get("xaxis", {}), "nticks": 4, "tickangle": 0},
-        "legend": layout.get("legend", {}),
-        "annotations": [{
-            "text": source,
-            "xref": "paper",
-            "yref": "paper",
-            "x": 0,
-            "y": -0.25,  # Lowered to ensure visibility
-            "showarrow": False,
-            "font": {"size": 12, "color": "#cccccc"},
-            "align": "left"
-        }],
-        "images": [
-            {
-                "source": "https://raw.githubusercontent.com/ThresholdMacro/ThresholdMacro/main/Images/Sphere_no_letters.png",
-                "xref": "paper",
-                "yref": "paper",
-                "x": 1.0,
-                "y": -0.25,
-                "sizex": 0.13,  # Slightly smaller for more space
-                "sizey": 0.13,
-                "xanchor": "right",
-                "yanchor": "bottom",
-                "sizing": "contain",
-                "opacity": 1,
-                "layer": "below"
-            }
-        ]
-    }
-    if theme == "dark":
-        layout_filtered["paper_bgcolor"] = "#1e3142"
-        layout_filtered["plot_bgcolor"] = "#1e3142"
-        layout_filtered["font"] = {"color": "#FFFFFF"}
-    else:
-        layout_filtered["paper_bgcolor"] = "#FAFAFA"
-        layout_filtered["plot_bgcolor"] = "#FAFAFA"
-        layout_filtered["font"] = {"color": "#0D1018"}
-    return {"data": series, "layout": layout_filtered}
-
-def apply_change(df, change_type, freq):
-    df = df.copy()
-    if change_type == "yoy":
-        periods = 4 if freq.upper() == "Q" else 12 if freq.upper() == "M" else 1
-        for col in df.columns:
-            if col != "date":
-                df[col] = df[col].astype(float).pct_change(periods=periods) * 100
-    elif change_type == "qoq":
-        periods = 1
-        for col in df.columns:
-            if col != "date":
-                df[col] = df[col].astype(float).pct_change(periods=periods) * 100
-    # else: do nothing for 'level'
-    return df
+    return figure_payload(fig, nome=nome, source=source, theme=theme)
+
+def apply_change(df, change_type, freq, window=None):
+    # Lags follow the data frequency; see utils.transforms for the transforms
+    return transform(df, change_type, freq, window)
 
 # Register the API router with the main OpenBB router
 router.include_router(api_router)
@@ -0,0 +1,108 @@
+"""Single-pass alignment of many observation series on a shared period index."""
+
+import numpy as np
+import pandas as pd
+
+from openbb_dbnomics.utils.periods import period_ordinals, sort_order, window
+
+# Shapes get_multi_series_aligned can return
+OUTPUTS = ("records", "frame", "columns")
+
+
+def to_float_array(values):
+    """Observation values as float64, with DBnomics ``"NA"`` and None as NaN."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):  # "NA" markers or other non-numeric values
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+class AlignedSeries:
+    """Several series laid out as columns of one matrix over sorted periods."""
+
+    def __init__(self, periods, names, values, ordinals=None):
+        self.periods = periods  # 1-D array of period labels, in chronological order
+        self.names = list(names)
+        self.values = values  # float64 matrix, one row per period, one column per series
+        # Day ordinal of each period's start; see utils.periods
+        self.ordinals = period_ordinals(periods) if ordinals is None else ordinals
+
+    def __len__(self):
+        return len(self.periods)
+
+    def between(self, first=None, last=None):
+        """Rows whose period starts within ``[first, last]`` (day ordinals)."""
+        lo, hi = window(self.ordinals, first, last)
+        if lo == 0 and hi == len(self):
+            return self
+        return AlignedSeries(self.periods[lo:hi], self.names, self.values[lo:hi], self.ordinals[lo:hi])
+
+    def to_frame(self):
+        """DataFrame indexed by ``date`` with one column per series."""
+        index = pd.Index(self.periods, name="date")
+        return pd.DataFrame(self.values, index=index, columns=self.names, copy=False)
+
+    def to_columns(self):
+        """``{"date": [...], name: [...]}`` lists, with None for missing values."""
+        columns = {"date": self.periods.tolist()}
+        for j, name in enumerate(self.names):
+            column = self.values[:, j]
+            columns[name] = np.where(np.isnan(column), None, column).tolist()
+        return columns
+
+    def to_records(self):
+        """One ``{"date": ..., name: value}`` dict per period (NaN when missing)."""
+        keys = ["date"] + self.names
+        columns = [self.periods.tolist()] + [self.values[:, j].tolist() for j in range(len(self.names))]
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+
+    def to_output(self, output: str = "records"):
+        if output == "frame":
+            return self.to_frame()
+        if output == "columns":
+            return self.to_columns()
+        if output == "records":
+            return self.to_records()
+        raise ValueError(f"Unknown output {output!r}; expected one of {OUTPUTS}")
+
+
+def align_series(series, first=None, last=None):
+    """Align ``{name: (periods, values)}`` on the union of their periods.
+
+    Series given as None are left out. All periods are hashed to codes in one
+    pass, only the distinct periods are parsed and sorted (chronologically,
+    whatever their format), and every value is scattered into its (period,
+    series) cell at once, instead of one outer merge (and re-sort) per series.
+    With ``first``/``last`` day ordinals, periods starting outside that
+    window are cut from the sorted index by binary search, and only each
+    series' values inside the window are converted to floats and placed.
+    """
+    names = [name for name, observations in series.items() if observations is not None]
+    if not names:
+        return AlignedSeries(np.empty(0, dtype=object), [], np.empty((0, 0)))
+    period_arrays = [np.asarray(series[name][0], dtype=object) for name in names]
+    codes, labels = pd.factorize(np.concatenate(period_arrays))
+    ordinals = period_ordinals(labels)
+    order = sort_order(labels, ordinals)
+    lo, hi = window(ordinals[order], first, last)
+    order = order[lo:hi]
+    rank = np.full(len(labels), -1, dtype=np.intp)
+    rank[order] = np.arange(len(order))
+    rows = rank[codes]
+    values = np.full((len(order), len(names)), np.nan)
+    start = 0
+    for column, (name, periods) in enumerate(zip(names, period_arrays)):
+        series_rows = rows[start:start + len(periods)]
+        start += len(periods)
+        keep = np.flatnonzero(series_rows >= 0)
+        if not len(keep):
+            continue
+        observations = series[name][1]
+        first_kept, end = keep[0], keep[-1] + 1
+        if end - first_kept == len(keep):
+            # DBnomics lists periods in order, so the window is one slice
+            observations = observations[first_kept:end]
+        else:
+            observations = np.asarray(observations, dtype=object)[keep]
+        values[series_rows[keep], column] = to_float_array(observations)
+    return AlignedSeries(labels[order], names, values, ordinals[order])
@@ -0,0 +1,145 @@
+"""Bounded in-process cache with per-entry TTL and size-based LRU eviction."""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+# Decoded JSON (dicts, lists, str and float objects) takes several times the
+# bytes of its encoding: about 5x for series documents and 6x for search
+# results on CPython. Used to charge decoded responses against max_bytes.
+DECODED_JSON_FACTOR = 5
+
+
+def decoded_size(payload_bytes: int) -> int:
+    """Estimated in-memory size of JSON decoded from ``payload_bytes`` bytes."""
+    return payload_bytes * DECODED_JSON_FACTOR
+
+
+def approximate_size(value, limit: int = 200_000) -> int:
+    """Rough deep ``sys.getsizeof`` of JSON-like data.
+
+    Walks at most ``limit`` objects so sizing a huge document stays cheap; the
+    result is an estimate used only for eviction accounting.
+    """
+    size = 0
+    stack = [value]
+    seen = 0
+    while stack and seen < limit:
+        obj = stack.pop()
+        seen += 1
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return size
+
+
+class TTLCache:
+    """Thread-safe LRU cache bounded by approximate bytes, with per-entry TTL.
+
+    An entry may outlive its TTL by ``stale_ttl`` seconds. ``get`` never
+    returns such stale entries, but ``lookup`` does, so callers can fall back
+    to the last good copy when the upstream is unavailable.
+
+    Values are stored and returned by reference, not copied: every caller
+    gets the same object, so cached values must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires_at, stale_until)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "expirations": 0,
+        }
+
+    def get(self, key, default=None):
+        found = self.lookup(key, allow_stale=False)
+        return default if found is None else found[0]
+
+    def lookup(self, key, allow_stale: bool = True):
+        """Return ``(value, expires_in)`` for ``key``, or None.
+
+        ``expires_in`` is negative for a stale entry still inside its grace
+        period; stale entries are only returned when ``allow_stale`` is set.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            value, size, expires_at, stale_until = entry
+            now = time.monotonic()
+            if stale_until <= now:
+                self._remove(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            if expires_at <= now and not allow_stale:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits" if expires_at > now else "stale_hits"] += 1
+            return value, expires_at - now
+
+    def set(self, key, value, ttl: float = None, size: int = None, stale_ttl: float = 0.0):
+        """Store ``value``; ``size`` defaults to an estimate of its footprint.
+
+        Callers knowing only the size of an encoded payload should charge
+        ``decoded_size`` of it, not the raw byte count.
+        """
+        if size is None:
+            size = approximate_size(value)
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at, expires_at + stale_ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            return self._remove(key)[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[2] > time.monotonic()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+        return entry
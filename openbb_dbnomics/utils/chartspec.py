@@ -0,0 +1,158 @@
+"""Chart payloads for the OpenBB chart widget.
+
+Line and bar charts are written straight from the DataFrame into the
+``{"data", "layout"}`` payload: values are NaN-masked with NumPy and the
+layout comes from a per-theme template built once at import. A plotly
+Figure (from ``myplot.plot_ts``) is only needed for ``FIGURE_CHARTS``,
+whose traces plotly computes; ``figure_payload`` converts those.
+"""
+
+import copy
+
+import numpy as np
+
+from openbb_dbnomics.utils.downsample import downsample_indices
+
+LOGO_URL = "https://raw.githubusercontent.com/ThresholdMacro/ThresholdMacro/main/Images/Sphere_no_letters.png"
+
+# Chart types whose traces are computed by plotly (fits, violins)
+FIGURE_CHARTS = ("regression", "distribution")
+
+
+def _axis(theme):
+    """Axis style ``plot_ts`` produces for ``theme``."""
+    light = theme == "light"
+    line_color = "black" if light else "white"
+    return {
+        "showgrid": False,
+        "showline": True,
+        "linewidth": 1.2,
+        "linecolor": line_color,
+        "zeroline": True,
+        "zerolinecolor": "#ededed" if light else "#333333",
+        "tickfont": {"color": "#0D1018" if light else "#FFFFFF"},
+        "tickwidth": 1,
+        "tickcolor": line_color,
+        "ticks": "inside",
+    }
+
+
+def _template(theme):
+    dark = theme == "dark"
+    text_color = "#0D1018" if theme == "light" else "#FFFFFF"
+    background = "#1e3142" if dark else "#FAFAFA"
+    return {
+        "title": {
+            "text": "",
+            "font": {"size": 22, "color": "#FFFFFF" if dark else "#0D1018"},
+            "x": 0.5,  # Center the title
+            "xanchor": "center"
+        },
+        "yaxis": {**_axis(theme), "title": {"text": ""}, "nticks": 8},
+        "xaxis": {**_axis(theme), "nticks": 4, "tickangle": 0},
+        "legend": {
+            "font": {"family": "Verdana", "color": text_color},
+            "orientation": "h",
+            "yanchor": "bottom",
+            "y": 1.0,
+            "xanchor": "left",
+            "x": 0,
+        },
+        "annotations": [{
+            "text": "",
+            "xref": "paper",
+            "yref": "paper",
+            "x": 0,
+            "y": -0.25,  # Lowered to ensure visibility
+            "showarrow": False,
+            "font": {"size": 12, "color": "#cccccc"},
+            "align": "left"
+        }],
+        "images": [{
+            "source": LOGO_URL,
+            "xref": "paper",
+            "yref": "paper",
+            "x": 1.0,
+            "y": -0.25,
+            "sizex": 0.13,  # Slightly smaller for more space
+            "sizey": 0.13,
+            "xanchor": "right",
+            "yanchor": "bottom",
+            "sizing": "contain",
+            "opacity": 1,
+            "layer": "below"
+        }],
+        "paper_bgcolor": background,
+        "plot_bgcolor": background,
+        "font": {"color": "#FFFFFF" if dark else "#0D1018"},
+    }
+
+
+_TEMPLATES = {theme: _template(theme) for theme in ("light", "dark")}
+
+
+def _layout(nome, source, theme):
+    template = _TEMPLATES.get(theme)
+    layout = copy.deepcopy(template if template is not None else _template(theme))
+    layout["title"]["text"] = nome
+    layout["annotations"][0]["text"] = source
+    return layout
+
+
+def _masked(column):
+    """Float column as a list with None in place of NaN and infinities."""
+    values = column.astype(object)
+    values[~np.isfinite(column)] = None
+    return values.tolist()
+
+
+def chart_payload(df, nome, units, chart="line", source="", theme="light",
+                  max_points=None, method="minmax"):
+    """Widget payload for a line or bar chart of ``df`` (one trace per column).
+
+    With ``max_points``, each trace longer than that is reduced to at most
+    ``max_points`` of its observations; see ``utils.downsample``.
+    """
+    layout = _layout(nome, source, theme)
+    layout["yaxis"]["title"]["text"] = units
+    if "pct" in chart.lower():
+        layout["yaxis"]["tickformat"] = ",.2%"
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    if not max_points or len(df) <= max_points:
+        x = df.index.tolist()
+        data = [
+            {"name": str(col), "x": x, "y": _masked(values[:, j]), "type": "line"}
+            for j, col in enumerate(df.columns)
+        ]
+        return {"data": data, "layout": layout}
+    index = np.asarray(df.index, dtype=object)
+    data = []
+    for j, col in enumerate(df.columns):
+        keep = downsample_indices(values[:, j], max_points, method)
+        data.append({"name": str(col), "x": index[keep].tolist(), "y": _masked(values[keep, j]), "type": "line"})
+    return {"data": data, "layout": layout}
+
+
+def figure_payload(fig, nome, source="", theme="light"):
+    """Widget payload from a plotly Figure built by ``plot_ts``."""
+    series = []
+    for trace in fig.data:
+        if getattr(trace, "x", None) is None or getattr(trace, "y", None) is None:
+            continue
+        y = np.asarray(trace.y, dtype=object)
+        numeric = np.array([isinstance(val, (int, float)) for val in y], dtype=bool)
+        bad = np.zeros(len(y), dtype=bool)
+        bad[numeric] = ~np.isfinite(y[numeric].astype(np.float64))
+        y[bad] = None
+        series.append({
+            "name": getattr(trace, "name", None) or "",
+            "x": list(trace.x),
+            "y": y.tolist(),
+            "type": "line",
+        })
+    layout = _layout(nome, source, theme)
+    plotted = fig.layout.to_plotly_json()
+    layout["yaxis"] = {**plotted.get("yaxis", {}), "nticks": 8}
+    layout["xaxis"] = {**plotted.get("xaxis", {}), "nticks": 4, "tickangle": 0}
+    layout["legend"] = plotted.get("legend", {})
+    return {"data": series, "layout": layout}
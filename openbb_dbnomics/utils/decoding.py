@@ -0,0 +1,94 @@
+"""Pluggable JSON decoding for DBnomics payloads.
+
+Backends, fastest first: msgspec (typed, decodes series responses straight
+into dicts holding only the fields the client reads), orjson, and the
+standard library. Pick one with ``DBNOMICS_JSON_DECODER`` (``auto``,
+``msgspec``, ``orjson`` or ``json``); ``auto`` uses the fastest installed.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, TypedDict
+
+try:
+    import msgspec
+except ImportError:  # optional dependency
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class SeriesDoc(TypedDict, total=False):
+    """The fields of a DBnomics series document the client uses."""
+
+    provider_code: str
+    dataset_code: str
+    dataset_name: str
+    series_code: str
+    series_name: str
+    indexed_at: str
+    dimensions: Dict[str, Any]
+    period: List[str]
+    periods: List[str]
+    period_start_day: List[str]
+    value: List[Any]
+    values: List[Any]
+
+
+class SeriesPage(TypedDict, total=False):
+    docs: List[SeriesDoc]
+    num_found: Optional[int]
+    offset: Optional[int]
+    limit: Optional[int]
+
+
+class SeriesResponse(TypedDict, total=False):
+    """Envelope of /series responses (listings and observations)."""
+
+    series: SeriesPage
+
+
+# Response kinds decoded against a typed schema when msgspec is available
+TYPED_KINDS = {"series": SeriesResponse, "observations": SeriesResponse}
+
+
+class JSONDecoder:
+    """Decode response bodies with the configured backend."""
+
+    BACKENDS = ("msgspec", "orjson", "json")
+
+    def __init__(self, backend: str = "auto"):
+        if backend == "auto":
+            backend = "msgspec" if msgspec else "orjson" if orjson else "json"
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown JSON decoder backend {backend!r}")
+        if (backend == "msgspec" and msgspec is None) or (backend == "orjson" and orjson is None):
+            raise ImportError(f"JSON decoder backend {backend!r} is not installed")
+        self.backend = backend
+        self._typed = {}
+        if backend == "msgspec":
+            self._generic = msgspec.json.Decoder()
+            self._typed = {kind: msgspec.json.Decoder(schema) for kind, schema in TYPED_KINDS.items()}
+        elif backend == "orjson":
+            self._generic = orjson.loads
+        else:
+            self._generic = json.loads
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("DBNOMICS_JSON_DECODER", "auto"))
+
+    def decode(self, body: bytes, kind: str = None):
+        """Decode ``body``; ``kind`` selects a typed schema where one exists."""
+        typed = self._typed.get(kind)
+        if typed is not None:
+            try:
+                return typed.decode(body)
+            except msgspec.ValidationError:
+                pass  # unexpected shape: fall back to a generic decode
+        if self.backend == "msgspec":
+            return self._generic.decode(body)
+        return self._generic(body)
@@ -0,0 +1,171 @@
+"""Persistent SQLite cache of DBnomics response bodies with HTTP revalidation."""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+
+class CachedResponse:
+    """A stored response body plus the validators needed to revalidate it."""
+
+    __slots__ = ("body", "etag", "last_modified", "expires_at")
+
+    def __init__(self, body, etag, last_modified, expires_at):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self):
+        return self.expires_at > time.time()
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DiskCache:
+    """Compressed response store keyed by request URL.
+
+    Entries outlive their TTL on purpose: once stale they are revalidated
+    with ``If-None-Match``/``If-Modified-Since`` so an unchanged resource
+    costs a 304 instead of a full download. With ``max_age`` set, entries
+    not stored or revalidated for that many seconds are purged when the
+    cache is opened and then at most every ``PURGE_INTERVAL`` seconds as
+    new responses are stored, so the file does not grow without bound.
+    """
+
+    # Most seconds between two purges of entries older than max_age
+    PURGE_INTERVAL = 3600
+
+    # Seconds an entry is served without revalidation, by endpoint kind
+    DEFAULT_TTLS = {
+        "providers": 24 * 3600,
+        "metadata": 24 * 3600,
+        "search": 3600,
+        "series": 6 * 3600,
+        "observations": 3600,
+    }
+
+    def __init__(self, path: str, ttls: dict = None, compress_level: int = 6, max_age: float = None):
+        if os.path.isdir(path) or not os.path.splitext(path)[1]:
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, "responses.sqlite")
+        self.path = path
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, kind TEXT, body BLOB, etag TEXT,"
+            " last_modified TEXT, stored_at REAL, expires_at REAL)"
+        )
+        self._counters = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "purged": 0}
+        self.max_age = max_age or None
+        self._next_purge = 0.0
+        self._purge_if_due()
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache under ``$DBNOMICS_CACHE_DIR``, or return None if unset.
+
+        ``$DBNOMICS_CACHE_MAX_AGE`` (seconds, default 7 days; 0 keeps
+        everything) sets ``max_age``.
+        """
+        path = os.environ.get("DBNOMICS_CACHE_DIR")
+        if not path:
+            return None
+        max_age = float(os.environ.get("DBNOMICS_CACHE_MAX_AGE", 7 * 24 * 3600))
+        return cls(os.path.expanduser(path), max_age=max_age)
+
+    @staticmethod
+    def make_key(url, params=None):
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def ttl_for(self, kind):
+        return self.ttls.get(kind)
+
+    def lookup(self, key):
+        """Return the stored entry for ``key`` (fresh or stale), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        body, etag, last_modified, expires_at = row
+        entry = CachedResponse(zlib.decompress(body), etag, last_modified, expires_at)
+        self._count("hits" if entry.fresh else "misses")
+        return entry
+
+    def store(self, key, kind, body: bytes, etag: str = None, last_modified: str = None):
+        now = time.time()
+        compressed = zlib.compress(body, self.compress_level)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, compressed, etag, last_modified, now, now + self.ttls.get(kind, 0)),
+            )
+        self._count("stores")
+        self._purge_if_due()
+
+    def touch(self, key, kind):
+        """Mark ``key`` fresh again after the server answered 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, expires_at = ? WHERE key = ?",
+                (now, now + self.ttls.get(kind, 0), key),
+            )
+        self._count("revalidated")
+
+    def purge(self, older_than: float):
+        """Delete entries not stored or revalidated within ``older_than`` seconds."""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (time.time() - older_than,)
+            ).rowcount
+            self._counters["purged"] += max(deleted, 0)
+        return deleted
+
+    def _purge_if_due(self):
+        if self.max_age is None:
+            return
+        now = time.time()
+        with self._lock:
+            if now < self._next_purge:
+                return
+            self._next_purge = now + min(self.max_age, self.PURGE_INTERVAL)
+        self.purge(self.max_age)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses"
+            ).fetchone()
+        stats["entries"] = entries
+        stats["bytes"] = size
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
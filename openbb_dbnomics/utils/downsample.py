@@ -0,0 +1,93 @@
+"""Downsampling of long series to a bounded number of chart points.
+
+Both methods pick a subset of the original observations (no values are
+averaged or invented), always keep the first and last point, and work on
+row positions, so they apply to periods of any frequency:
+
+- ``minmax`` splits the series into equal buckets and keeps the lowest and
+  highest value of each, so every peak and trough survives. Buckets that are
+  entirely missing keep one NaN point, so gaps in the line stay visible.
+- ``lttb`` (Largest-Triangle-Three-Buckets) keeps, per bucket, the point
+  forming the largest triangle with the previously kept point and the mean
+  of the next bucket. It follows the shape of the line more smoothly, but
+  may drop extremes that are not visually prominent; missing values are
+  skipped.
+"""
+
+import numpy as np
+
+METHODS = ("minmax", "lttb")
+
+
+def _bucket_edges(start, stop, n_buckets):
+    """``n_buckets + 1`` increasing positions splitting ``[start, stop)`` evenly."""
+    return np.linspace(start, stop, n_buckets + 1).astype(np.intp)
+
+
+def minmax_indices(y, max_points: int) -> np.ndarray:
+    """Positions of the first, last, and per-bucket min and max of ``y``."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    n_buckets = max(1, (max_points - 2) // 2)
+    edges = _bucket_edges(1, n - 1, n_buckets)
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    starts, sizes = starts[sizes > 0], sizes[sizes > 0]
+    inner = y[1:n - 1]
+    offsets = starts - 1
+    with np.errstate(invalid="ignore"):
+        lows = np.fmin.reduceat(inner, offsets)
+        highs = np.fmax.reduceat(inner, offsets)
+    bucket = np.repeat(np.arange(len(starts)), sizes)
+    picked = [np.array([0, n - 1])]
+    for extremes in (lows, highs):
+        hits = np.flatnonzero(inner == extremes[bucket])
+        # First position reaching the bucket's extreme
+        _, first = np.unique(bucket[hits], return_index=True)
+        picked.append(hits[first] + 1)
+    picked.append(starts[np.isnan(lows)])
+    return np.unique(np.concatenate(picked))
+
+
+def lttb_indices(y, max_points: int) -> np.ndarray:
+    """Positions chosen by Largest-Triangle-Three-Buckets over the finite values of ``y``."""
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.flatnonzero(np.isfinite(y))
+    n = len(finite)
+    if n <= max(max_points, 2):
+        return finite
+    x = finite.astype(np.float64)
+    v = y[finite]
+    n_buckets = max(1, max_points - 2)
+    edges = _bucket_edges(1, n - 1, n_buckets)
+    # Mean point of every bucket, computed in one pass
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_v = np.add.reduceat(v[1:n - 1], edges[:-1] - 1)
+    counts = np.maximum(np.diff(edges), 1)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_v = np.append(sums_v / counts, v[-1])
+    chosen = np.empty(n_buckets + 2, dtype=np.intp)
+    chosen[0], chosen[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_buckets):
+        lo, hi = edges[i], edges[i + 1]
+        if hi <= lo:
+            chosen[i + 1] = previous
+            continue
+        ax, av = x[previous], v[previous]
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs((ax - mean_x[i + 1]) * (v[lo:hi] - av) - (ax - x[lo:hi]) * (mean_v[i + 1] - av))
+        previous = lo + int(np.argmax(areas))
+        chosen[i + 1] = previous
+    return finite[np.unique(chosen)]
+
+
+def downsample_indices(y, max_points: int, method: str = "minmax") -> np.ndarray:
+    """Positions of at most ``max_points`` observations of ``y`` to plot."""
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    if method == "lttb":
+        return lttb_indices(y, max_points)
+    raise ValueError(f"Unknown downsampling method {method!r}; expected one of {', '.join(METHODS)}")
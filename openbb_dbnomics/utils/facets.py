@@ -0,0 +1,80 @@
+"""Dimension index for faceted filtering of a dataset's series.
+
+Every dimension of a SeriesListing (REF_AREA, INDICATOR, FREQ, ...) is kept
+as the listing's Categorical codes: one small integer per series plus the
+table of distinct values. A query selects, per dimension, the series whose
+code is any of the chosen values (OR) and ANDs the dimensions together;
+facet counts are a ``bincount`` of each dimension's codes over the series
+the other selections keep. Memory and work are O(series) per dimension
+whatever the number of distinct values, and narrowing a selection never
+goes back to DBnomics or re-reads the listing.
+"""
+
+import numpy as np
+import pandas as pd
+
+from openbb_dbnomics.utils.listing import BASE_FIELDS, _filter_values
+
+
+class FacetIndex:
+    """Per-dimension value codes over the series of a SeriesListing.
+
+    As in ``SeriesListing.mask``, a series without a dimension passes any
+    selection on it. Facet counts are disjunctive: the counts of a dimension
+    apply the selections of every other dimension but not its own, so the
+    alternatives to the current choice stay visible.
+    """
+
+    def __init__(self, listing):
+        self.listing = listing
+        self.size = len(listing)
+        self.dimensions = {}  # dimension -> (values, {value: code}, codes; -1 where missing)
+        for field, column in listing.columns.items():
+            if field in BASE_FIELDS or not isinstance(column, pd.Categorical):
+                continue
+            values = list(column.categories)
+            self.dimensions[field] = (
+                values, {value: code for code, value in enumerate(values)}, np.asarray(column.codes)
+            )
+
+    @property
+    def nbytes(self):
+        return sum(codes.nbytes for _, _, codes in self.dimensions.values())
+
+    def _selection(self, dimension, values):
+        """Mask of the series with any of ``values`` (or no value) for ``dimension``."""
+        _, lookup, codes = self.dimensions[dimension]
+        wanted = [lookup[value] for value in values if value in lookup]
+        return np.isin(codes, wanted) | (codes == -1)
+
+    def _intersect(self, masks):
+        result = np.ones(self.size, dtype=bool)
+        for mask in masks:
+            result &= mask
+        return result
+
+    def query(self, ref_area: str = None, dimensions: dict = None):
+        """Positions of the matching series, and ``{dimension: {value: count}}``.
+
+        Takes the /series filters: ``dimensions`` maps a dimension to one or
+        more values, ``ref_area`` is a shortcut for REF_AREA. Filters on
+        dimensions the listing does not have are ignored. Counts of zero are
+        left out.
+        """
+        selections = {
+            dimension: self._selection(dimension, values)
+            for dimension, values in _filter_values(ref_area, dimensions).items()
+            if dimension in self.dimensions
+        }
+        matched = self._intersect(selections.values())
+        counts = {}
+        for dimension, (values, _, codes) in self.dimensions.items():
+            others = self._intersect(
+                mask for other, mask in selections.items() if other != dimension
+            )
+            kept = codes[others]
+            totals = np.bincount(kept[kept >= 0], minlength=len(values))
+            counts[dimension] = {
+                values[code]: int(totals[code]) for code in np.flatnonzero(totals)
+            }
+        return np.flatnonzero(matched), counts
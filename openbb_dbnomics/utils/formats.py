@@ -0,0 +1,84 @@
+"""Column-oriented encodings of an aligned frame for the series endpoints.
+
+Every encoder takes the frame returned by ``get_multi_series_aligned(...,
+output="frame")`` (indexed by ``date``, one float column per indicator) and
+converts it a column at a time, never building a Python object per row:
+
+- ``columns``: JSON ``{"date": [...], "IND": [...]}``, with null for
+  missing values
+- ``arrow``: Apache Arrow IPC stream bytes
+- ``parquet``: Parquet file bytes
+
+The Arrow-based formats require ``pyarrow``; without it they raise
+ImportError.
+"""
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+FORMATS = ("records", "columns", "arrow", "parquet")
+BINARY_FORMATS = ("arrow", "parquet")
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _values(df):
+    """Float matrix of ``df`` with infinities as NaN."""
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isinf(values), np.nan, values)
+
+
+def to_columns(df) -> dict:
+    """``{"date": [...], name: [...]}`` lists, with None for missing values."""
+    values = _values(df)
+    columns = {"date": [str(label) for label in df.index]}
+    for j, name in enumerate(df.columns):
+        column = values[:, j]
+        columns[str(name)] = np.where(np.isnan(column), None, column).tolist()
+    return columns
+
+
+def to_arrow_table(df):
+    """Arrow table with a string ``date`` column and nullable float64 columns."""
+    if pa is None:
+        raise ImportError("Arrow and Parquet formats require pyarrow (pip install pyarrow)")
+    values = _values(df)
+    arrays = [pa.array(np.asarray(df.index, dtype=object).astype(str), type=pa.string())]
+    arrays += [pa.array(values[:, j], mask=np.isnan(values[:, j])) for j in range(values.shape[1])]
+    return pa.Table.from_arrays(arrays, names=["date"] + [str(name) for name in df.columns])
+
+
+def to_arrow_ipc(df) -> bytes:
+    """Arrow IPC stream holding ``df`` as a single record batch."""
+    table = to_arrow_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(df) -> bytes:
+    """Parquet file holding ``df``."""
+    table = to_arrow_table(df)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_frame(df, fmt: str):
+    """``df`` in ``fmt``: a dict for ``columns``, bytes for the binary formats."""
+    if fmt == "columns":
+        return to_columns(df)
+    if fmt == "arrow":
+        return to_arrow_ipc(df)
+    if fmt == "parquet":
+        return to_parquet(df)
+    raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
@@ -0,0 +1,158 @@
+"""Columnar, dictionary-encoded representation of a series listing."""
+
+import sys
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Keys every flattened series carries, even when DBnomics leaves them empty
+BASE_FIELDS = ("series_code", "series_name", "dataset_code", "dataset_name", "provider_code")
+# Fields unique to each series gain nothing from dictionary encoding
+UNIQUE_FIELDS = ("series_code", "series_name")
+
+
+def _filter_values(ref_area=None, dimensions=None):
+    """Normalize /series filters into {dimension: [allowed values]}."""
+    allowed = {}
+    for dim, values in (dimensions or {}).items():
+        values = [values] if isinstance(values, str) else list(values)
+        if values:
+            allowed[dim] = values
+    if ref_area:
+        allowed.setdefault("REF_AREA", [ref_area])
+    return allowed
+
+
+class SeriesListing:
+    """Flattened series stored column by column.
+
+    Repeated fields (dataset and provider names, every dimension) are pandas
+    Categoricals: one string table per field plus a small integer code per
+    series, so a 10k-series listing holds each dimension value once. Filters
+    are NumPy masks over those codes, and per-series dicts are only built by
+    ``to_records`` for the rows actually returned.
+    """
+
+    def __init__(self, columns: dict, length: int):
+        self.columns = columns  # field -> object ndarray or pd.Categorical
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a listing from flattened series dicts, consumed one at a time."""
+        order = list(UNIQUE_FIELDS)
+        strings = {field: [] for field in UNIQUE_FIELDS}
+        tables = {}  # field -> {value: code}
+        codes = {}  # field -> array of codes, -1 where the series lacks the field
+        length = 0
+        for record in records:
+            for field in UNIQUE_FIELDS:
+                strings[field].append(record.get(field))
+            for field, value in record.items():
+                if field in strings:
+                    continue
+                column = codes.get(field)
+                if column is None:
+                    column = codes[field] = array("i", [-1]) * length
+                    tables[field] = {}
+                    order.append(field)
+                if value is None:
+                    column.append(-1)
+                    continue
+                table = tables[field]
+                code = table.get(value)
+                if code is None:
+                    code = table[value] = len(table)
+                column.append(code)
+            length += 1
+            for column in codes.values():
+                if len(column) < length:
+                    column.append(-1)
+        columns = {}
+        for field in order:
+            if field in strings:
+                columns[field] = np.array(strings[field], dtype=object)
+            else:
+                columns[field] = pd.Categorical.from_codes(
+                    np.array(codes[field], dtype=np.int32), categories=list(tables[field])
+                )
+        return cls(columns, length)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(key)
+        raise TypeError("SeriesListing supports slicing only; use take() for indices")
+
+    @property
+    def fields(self):
+        return list(self.columns)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the listing."""
+        size = 0
+        for column in self.columns.values():
+            if isinstance(column, pd.Categorical):
+                size += column.codes.nbytes
+                size += sum(sys.getsizeof(value) for value in column.categories)
+            else:
+                size += column.nbytes + sum(sys.getsizeof(value) for value in column)
+        return size
+
+    def mask(self, ref_area: str = None, dimensions: dict = None, name_filter: str = None):
+        """Boolean mask of the series passing the /series filters.
+
+        A series is rejected by a dimension filter only when it carries that
+        dimension with another value. ``name_filter`` is a case-insensitive
+        substring match on ``series_name``.
+        """
+        mask = np.ones(self.length, dtype=bool)
+        for dim, values in _filter_values(ref_area, dimensions).items():
+            column = self.columns.get(dim)
+            if column is None:
+                continue
+            if isinstance(column, pd.Categorical):
+                wanted = column.categories.get_indexer(values)
+                mask &= np.isin(column.codes, wanted[wanted >= 0]) | (column.codes < 0)
+            else:
+                mask &= np.isin(column, values) | pd.isna(column)
+        if name_filter:
+            names = pd.Series(self.columns["series_name"], copy=False)
+            mask &= names.str.contains(name_filter, case=False, regex=False, na=False).to_numpy()
+        return mask
+
+    def filter(self, ref_area: str = None, dimensions: dict = None, name_filter: str = None):
+        """Listing of the series passing ``mask``; self when nothing is filtered."""
+        if not (_filter_values(ref_area, dimensions) or name_filter):
+            return self
+        return self.take(np.flatnonzero(self.mask(ref_area, dimensions, name_filter)))
+
+    def take(self, indices):
+        """New listing of the given rows (a slice or integer positions).
+
+        The string tables are shared with this listing, not copied.
+        """
+        columns = {field: column[indices] for field, column in self.columns.items()}
+        length = len(next(iter(columns.values()))) if columns else 0
+        return type(self)(columns, length)
+
+    def to_records(self, start: int = 0, stop: int = None):
+        """Flattened series dicts for rows ``start:stop``, as ``flatten_series`` returns."""
+        stop = self.length if stop is None else min(stop, self.length)
+        records = [{} for _ in range(max(0, stop - start))]
+        for field, column in self.columns.items():
+            part = column[start:stop]
+            if isinstance(part, pd.Categorical):
+                table = list(part.categories)
+                values = [table[code] if code >= 0 else None for code in part.codes.tolist()]
+            else:
+                values = part.tolist()
+            keep_missing = field in BASE_FIELDS
+            for record, value in zip(records, values):
+                if value is not None or keep_missing:
+                    record[field] = value
+        return records
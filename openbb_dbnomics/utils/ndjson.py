@@ -0,0 +1,51 @@
+"""Newline-delimited JSON streaming of listing endpoints.
+
+A client sending ``Accept: application/x-ndjson`` gets one document per line
+as the documents are fetched, sent with chunked transfer encoding, instead
+of a JSON array built in memory first.
+"""
+
+import json
+from itertools import chain
+
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Lines are flushed in batches so tiny documents do not cost one write each
+_BATCH_BYTES = 64 * 1024
+
+
+def wants_ndjson(accept: str) -> bool:
+    """Whether an ``Accept`` header asks for NDJSON."""
+    return NDJSON_MEDIA_TYPE in (accept or "")
+
+
+def iter_ndjson(items, batch_bytes: int = _BATCH_BYTES):
+    """Encode ``items`` as NDJSON, yielding about ``batch_bytes`` at a time.
+
+    The first line is yielded on its own, so it reaches the client at once.
+    """
+    batch, size, limit = [], 0, 0
+    for item in items:
+        line = json.dumps(item, separators=(",", ":"), ensure_ascii=False) + "\n"
+        batch.append(line)
+        size += len(line)
+        if size >= limit:
+            yield "".join(batch).encode("utf-8")
+            batch, size, limit = [], 0, batch_bytes
+    if batch:
+        yield "".join(batch).encode("utf-8")
+
+
+def ndjson_response(items, headers: dict = None) -> StreamingResponse:
+    """Stream ``items`` as NDJSON.
+
+    The first item is fetched before the response starts, so an upstream
+    failure on the first request still surfaces as an error status rather
+    than a truncated 200.
+    """
+    items = iter(items)
+    first = next(items, None)
+    lines = iter_ndjson(chain([first], items)) if first is not None else iter(())
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,22 @@
+"""Opaque cursors for paginated endpoints."""
+
+import base64
+import json
+
+
+def encode_cursor(offset: int) -> str:
+    """Encode a listing offset as an opaque, URL-safe cursor."""
+    payload = json.dumps({"o": offset}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by ``encode_cursor``; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode()))["o"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("invalid cursor")
+    return offset
@@ -0,0 +1,139 @@
+"""Parsing of DBnomics period labels into sortable integer ordinals.
+
+DBnomics labels periods by frequency: ``2020`` (annual), ``2020-S1``
+(semester), ``2020-Q1`` (quarter), ``2020-03`` (month), ``2020-W05`` (ISO
+week) and ``2020-03-15`` (daily and business daily). Each label maps to the
+ordinal of its first day (days since 1970-01-01), so periods of any
+frequency sort, compare and slice as plain integers.
+"""
+
+import re
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Ordinal given to labels that are not DBnomics periods; sorts after all others
+UNKNOWN = np.iinfo(np.int64).max
+
+_EPOCH = date(1970, 1, 1).toordinal()
+_PERIOD = re.compile(
+    r"^(?P<year>\d{4})"
+    r"(?:-(?:Q(?P<quarter>[1-4])|S(?P<semester>[12])|W(?P<week>\d{2})"
+    r"|(?P<month>\d{2})(?:-(?P<day>\d{2}))?))?$"
+)
+
+
+def period_frequency(label: str):
+    """DBnomics frequency code of ``label``: A, S, Q, M, W or D; None if unknown."""
+    match = _PERIOD.match(label.strip())
+    if match is None:
+        return None
+    if match["quarter"]:
+        return "Q"
+    if match["semester"]:
+        return "S"
+    if match["week"]:
+        return "W"
+    if match["day"]:
+        return "D"
+    return "M" if match["month"] else "A"
+
+
+def _parse(label):
+    """``(first day, months, days)`` spanned by ``label``."""
+    match = _PERIOD.match(label.strip())
+    if match is None:
+        raise ValueError(f"Unrecognized DBnomics period {label!r}")
+    year = int(match["year"])
+    if match["quarter"]:
+        return date(year, 3 * int(match["quarter"]) - 2, 1), 3, 0
+    if match["semester"]:
+        return date(year, 6 * int(match["semester"]) - 5, 1), 6, 0
+    if match["week"]:
+        return date.fromisocalendar(year, int(match["week"]), 1), 0, 7
+    if match["day"]:
+        return date(year, int(match["month"]), int(match["day"])), 0, 1
+    if match["month"]:
+        return date(year, int(match["month"]), 1), 1, 0
+    return date(year, 1, 1), 12, 0
+
+
+def period_ordinal(label: str) -> int:
+    """Day ordinal of the first day of ``label``; raises ValueError if unparsable."""
+    return _parse(label)[0].toordinal() - _EPOCH
+
+
+def period_bounds(label: str):
+    """Day ordinals of the first and last day of ``label``."""
+    first, months, days = _parse(label)
+    if months:
+        years, month = divmod(first.month - 1 + months, 12)
+        after = date(first.year + years, month + 1, 1)
+    else:
+        after = first + timedelta(days=days)
+    return first.toordinal() - _EPOCH, after.toordinal() - _EPOCH - 1
+
+
+def _safe_ordinal(label):
+    try:
+        return period_ordinal(str(label))
+    except ValueError:
+        return UNKNOWN
+
+
+def period_ordinals(labels) -> np.ndarray:
+    """Vectorized ``period_ordinal``; unparsable labels map to ``UNKNOWN``.
+
+    Daily, monthly and annual labels go through NumPy's datetime parser;
+    other frequencies are parsed once per distinct label.
+    """
+    labels = np.asarray(labels, dtype=object)
+    ordinals = np.full(len(labels), UNKNOWN, dtype=np.int64)
+    if not len(labels):
+        return ordinals
+    text = labels.astype(str)
+    lengths = np.char.str_len(text)
+    numeric = np.char.isdigit(np.char.replace(text, "-", ""))
+    pending = np.ones(len(labels), dtype=bool)
+    for length, unit in ((10, "D"), (7, "M"), (4, "Y")):
+        mask = numeric & (lengths == length)
+        if not mask.any():
+            continue
+        try:
+            days = text[mask].astype(f"datetime64[{unit}]").astype("datetime64[D]")
+        except ValueError:
+            continue  # malformed label in the group; parse those one by one
+        ordinals[mask] = days.astype(np.int64)
+        pending &= ~mask
+    if pending.any():
+        codes, uniques = pd.factorize(labels[pending])
+        parsed = np.fromiter((_safe_ordinal(label) for label in uniques), np.int64, len(uniques))
+        ordinals[pending] = parsed[codes]
+    return ordinals
+
+
+def sort_order(labels, ordinals=None) -> np.ndarray:
+    """Indices that sort ``labels`` chronologically, ties broken by label."""
+    labels = np.asarray(labels, dtype=object)
+    if ordinals is None:
+        ordinals = period_ordinals(labels)
+    order = np.argsort(ordinals, kind="stable")
+    if np.any(np.diff(ordinals[order]) == 0):
+        # Distinct labels sharing a start day, e.g. "2020" and "2020-Q1"
+        order = np.lexsort((labels.astype(str), ordinals))
+    return order
+
+
+def window(sorted_ordinals, first=None, last=None):
+    """``(lo, hi)`` slice of the periods starting within ``[first, last]``.
+
+    ``sorted_ordinals`` must be ascending; bounds are day ordinals and found
+    by binary search. Unparsable periods fall outside any bounded window.
+    """
+    if first is None and last is None:
+        return 0, len(sorted_ordinals)
+    lo = 0 if first is None else int(np.searchsorted(sorted_ordinals, first, "left"))
+    hi = int(np.searchsorted(sorted_ordinals, UNKNOWN if last is None else last,
+                             "left" if last is None else "right"))
+    return lo, max(lo, hi)
@@ -1,73 +1,727 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
+
 import requests
-import pandas as pd
 from fastapi.middleware.cors import CORSMiddleware
+from openbb_dbnomics.utils.alignment import align_series
+from openbb_dbnomics.utils.cache import MISSING, TTLCache, decoded_size
+from openbb_dbnomics.utils.decoding import JSONDecoder
+from openbb_dbnomics.utils.ratelimit import RateLimiter, RateLimitTimeout
+from openbb_dbnomics.utils.search_index import SearchIndex
+from openbb_dbnomics.utils.resilience import CircuitBreaker, CircuitOpenError, is_upstream_failure
+from openbb_dbnomics.utils.disk_cache import DiskCache
+from openbb_dbnomics.utils.facets import FacetIndex
+from openbb_dbnomics.utils.listing import SeriesListing, _filter_values
+from openbb_dbnomics.utils.periods import period_bounds
+from openbb_dbnomics.utils.series_store import SeriesStore
+from openbb_dbnomics.utils.singleflight import SingleFlight
+from openbb_dbnomics.utils.streaming import iter_response_items
+from openbb_dbnomics.utils.transport import HTTPTransport
+
+logger = logging.getLogger(__name__)
+
+# Per-request list of URLs answered from stale copies; see track_staleness
+_stale_sources = contextvars.ContextVar("dbnomics_stale_sources", default=None)
+# Set while the client works in the background (refreshes, index warm-ups)
+_background = contextvars.ContextVar("dbnomics_background", default=False)
 
 class DBNomicsClient:
     BASE_URL = "https://api.db.nomics.world/v22"
+    # Largest page the DBnomics /series listing will return
+    SERIES_PAGE_MAX = 1000
+    # Page size used when loading a provider's dataset list
+    DATASETS_PAGE_SIZE = 500
+    # Datasets whose series are kept in a local search index, and the largest
+    # listing that is indexed
+    SEARCH_INDEX_DATASETS = 16
+    SEARCH_INDEX_MAX_SERIES = 50_000
+    # Datasets kept with a dimension facet index, and the largest one indexed
+    FACET_INDEX_DATASETS = 16
+    FACET_INDEX_MAX_SERIES = 200_000
+    # Threads refreshing cache entries in the background, apart from the fetch pool
+    REFRESH_WORKERS = 2
+    # Seconds a request may queue for an upstream slot: requests answering a
+    # caller use the limiter's own timeout (DBNOMICS_QUEUE_TIMEOUT), while
+    # background work can afford to wait longer
+    QUEUE_TIMEOUTS = {"interactive": None, "background": 60.0}
+    # Seconds to keep decoded responses in the in-process cache, by kind
+    CACHE_TTLS = {
+        "providers": 6 * 3600,
+        "metadata": 3600,
+        "search": 600,
+        "series": 300,
+        "observations": 300,
+    }
+
+    def __init__(
+        self,
+        base_url: str = None,
+        transport: HTTPTransport = None,
+        max_concurrency: int = 8,
+        batch_size: int = 50,
+        cache: TTLCache = None,
+        cache_ttls: dict = None,
+        disk_cache: DiskCache = None,
+        series_store: SeriesStore = None,
+        breaker: CircuitBreaker = None,
+        stale_ttl: float = 24 * 3600,
+        refresh_ahead: float = 0.1,
+        decoder: JSONDecoder = None,
+        stream_threshold: int = 1000,
+        search_warmup: bool = None,
+        **transport_options,
+    ):
+        # All calls share one pooled keep-alive session; see HTTPTransport for
+        # the timeout/retry options that can be passed through.
+        self.base_url = base_url or self.BASE_URL
+        # Keep at least one pooled connection per concurrent fetch worker
+        transport_options.setdefault("pool_maxsize", max(16, max_concurrency))
+        # Rate limit and in-flight cap come from DBNOMICS_* env vars by default
+        if transport is None and "limiter" not in transport_options:
+            transport_options["limiter"] = RateLimiter.from_env()
+        self.transport = transport or HTTPTransport(**transport_options)
+        self.session = self.transport.session
+        # Cap on parallel upstream calls made by multi-series fetches
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = None
+        self._refresh_executor = None
+        self._executor_lock = threading.Lock()
+        # Series fetched per series_ids request; 1 disables batching
+        self.batch_size = max(1, batch_size)
+        self.cache = cache if cache is not None else TTLCache()
+        self.cache_ttls = {**self.CACHE_TTLS, **(cache_ttls or {})}
+        # Persistent response store; enabled by passing one or setting DBNOMICS_CACHE_DIR
+        self.disk_cache = disk_cache if disk_cache is not None else DiskCache.from_env()
+        # Local Parquet copy of fetched observations; see SeriesStore.from_env
+        self.series_store = series_store if series_store is not None else SeriesStore.from_env()
+        # Concurrent identical upstream calls share one in-flight request
+        self.singleflight = SingleFlight()
+        # Stale-while-revalidate: expired entries are kept stale_ttl seconds as
+        # a fallback, and entries within refresh_ahead of their TTL are
+        # refreshed in the background
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        # Fastest installed JSON backend unless DBNOMICS_JSON_DECODER says otherwise
+        self.decoder = decoder or JSONDecoder.from_env()
+        # Listings of at least this many series are parsed as they download
+        self.stream_threshold = stream_threshold
+        # Local full-text indexes; searches are answered from them while they
+        # are complete and within the TTL of the data they were built from
+        # (metadata for datasets, series for series names). With search_warmup
+        # (or DBNOMICS_SEARCH_WARMUP=1) they are (re)loaded in the background
+        # on the first search that finds them missing or expired.
+        if search_warmup is None:
+            search_warmup = os.environ.get("DBNOMICS_SEARCH_WARMUP", "0") == "1"
+        self.search_warmup = search_warmup
+        self.dataset_index = self._new_dataset_index()
+        # (provider, dataset) -> (SearchIndex, or None if too large to index; expiry)
+        self._series_indexes = OrderedDict()
+        self._facet_indexes = OrderedDict()  # (provider, dataset) -> (FacetIndex, expiry)
+        self._warming = set()
+        self._search_lock = threading.Lock()
+
+    def _get(self, url, params=None, headers=None, stream=False):
+        queue_timeout = self.QUEUE_TIMEOUTS["background" if _background.get() else "interactive"]
+        return self.transport.get(url, params=params, headers=headers, stream=stream,
+                                  queue_timeout=queue_timeout)
+
+    def _get_recorded(self, url, params=None, headers=None, stream=False):
+        """``_get``, recording on the breaker whether DBnomics answered.
+
+        A 5xx or a connection failure counts as a failure and any other
+        response as a success. Nothing is recorded when no request was sent
+        (e.g. the local rate limiter timed out).
+        """
+        try:
+            if stream:
+                response = self._get(url, params=params, stream=True)
+            else:
+                response = self._get(url, params=params, headers=headers)
+        except Exception as exc:
+            if is_upstream_failure(exc):
+                self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _get_json(self, url, params=None, kind: str = None, raise_errors: bool = False,
+                  revalidate: bool = False):
+        """GET ``url`` and decode the JSON body, or return None if it is not a 200.
+
+        Responses of a ``kind`` listed in ``cache_ttls`` are kept in the
+        in-process cache for that many seconds, and concurrent callers asking
+        for the same URL share one upstream request. Entries close to expiry
+        are refreshed in the background. When DBnomics fails, or the circuit
+        breaker is open, the last good copy is served and flagged as stale
+        (see ``track_staleness``) while a background refresh retries.
+        Cached responses are shared by every caller and must not be mutated.
+
+        With ``revalidate`` the cached copies are not served as fresh: the
+        request always reaches DBnomics, conditionally when the disk cache
+        holds an ETag or Last-Modified for it.
+        """
+        ttl = self.cache_ttls.get(kind)
+        key = (url, tuple(sorted((params or {}).items())))
+        cached = self.cache.lookup(key) if ttl else None
+        if cached is not None and cached[1] > 0 and not revalidate:
+            if cached[1] < ttl * self.refresh_ahead:
+                self._schedule_refresh(key, url, params, kind)
+            return cached[0]
+        if not self.breaker.allow():
+            stale = self._stale_copy(cached, url, params, kind)
+            if stale is MISSING:
+                raise CircuitOpenError(f"DBnomics circuit open; no cached copy of {url}")
+            return self._serve_stale(stale, key, url, params, kind)
+        try:
+            return self._load(key, url, params, kind, raise_errors, revalidate)
+        except (requests.RequestException, RateLimitTimeout) as exc:
+            stale = self._stale_copy(cached, url, params, kind)
+            if stale is not MISSING:
+                return self._serve_stale(stale, key, url, params, kind)
+            if not raise_errors and isinstance(exc, requests.HTTPError):
+                return None
+            raise
+
+    def _load(self, key, url, params, kind, raise_errors, revalidate=False):
+        """Fetch from upstream (coalesced) and feed the cache.
+
+        The breaker is fed by ``_fetch_json``, which only the singleflight
+        leader runs, so callers sharing a request count as one outcome.
+        """
+        data, size = self.singleflight.do(
+            key + (raise_errors, revalidate),
+            lambda: self._fetch_json(url, params, kind, raise_errors, revalidate)
+        )
+        ttl = self.cache_ttls.get(kind)
+        if data is not None and ttl:
+            # size counts payload bytes; the decoded objects take several times that
+            size = None if size is None else decoded_size(size)
+            self.cache.set(key, data, ttl=ttl, size=size, stale_ttl=self.stale_ttl)
+        return data
+
+    def _stale_copy(self, cached, url, params, kind):
+        if cached is not None:
+            return cached[0]
+        if self.disk_cache is not None and self.disk_cache.ttl_for(kind):
+            entry = self.disk_cache.lookup(self.disk_cache.make_key(url, params))
+            if entry is not None:
+                return self.decoder.decode(entry.body, kind)
+        return MISSING
+
+    def _serve_stale(self, data, key, url, params, kind):
+        self._flag_stale(url)
+        self._schedule_refresh(key, url, params, kind)
+        return data
+
+    @staticmethod
+    def _flag_stale(source):
+        sources = _stale_sources.get()
+        if sources is not None:
+            sources.append(source)
+
+    def _schedule_refresh(self, key, url, params, kind):
+        """Refresh ``key`` in the background unless a refresh is already queued.
+
+        Refreshes run on their own small pool, so a burst of them cannot
+        hold up the fetch pool that serves requests.
+        """
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            _background.set(True)
+            try:
+                if self.breaker.allow():
+                    self._load(key, url, params, kind, False)
+            except Exception:
+                pass  # already counted by the breaker; the stale copy stays
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._get_refresh_executor().submit(refresh)
+
+    @contextmanager
+    def track_staleness(self):
+        """Collect the URLs served from stale copies while the block runs.
+
+        Yields a list that is filled in as stale data is served, including by
+        fetches running on the client's worker pool.
+        """
+        sources = []
+        token = _stale_sources.set(sources)
+        try:
+            yield sources
+        finally:
+            _stale_sources.reset(token)
+
+    def _fetch_json(self, url, params, kind, raise_errors, revalidate=False):
+        """Fetch and decode one response through the disk cache, if enabled.
+
+        Returns ``(data, payload_bytes)``. A fresh disk entry is served
+        without a request (unless ``revalidate``); a stale one is revalidated
+        with its ETag or Last-Modified and reused on 304 Not Modified. Each
+        request that reaches DBnomics records one outcome on the breaker.
+        """
+        disk = self.disk_cache
+        if disk is None or not disk.ttl_for(kind):
+            disk = None
+        entry = None
+        headers = None
+        if disk is not None:
+            disk_key = disk.make_key(url, params)
+            entry = disk.lookup(disk_key)
+            if entry is not None:
+                if entry.fresh and not revalidate:
+                    return self.decoder.decode(entry.body, kind), len(entry.body)
+                headers = entry.conditional_headers() or None
+        response = self._get_recorded(url, params=params, headers=headers)
+        if entry is not None and response.status_code == 304:
+            disk.touch(disk_key, kind)
+            return self.decoder.decode(entry.body, kind), len(entry.body)
+        if raise_errors or response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code != 200:
+            return None, 0
+        content = response.content
+        data = self.decoder.decode(content, kind)
+        if disk is not None:
+            disk.store(
+                disk_key, kind, content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return data, len(content)
+
+    def stats(self):
+        stats = {
+            "transport": self.transport.stats(),
+            "cache": self.cache.stats(),
+            "singleflight": self.singleflight.stats(),
+            "breaker": self.breaker.stats(),
+            "search_index": {
+                "datasets": len(self.dataset_index),
+                "datasets_complete": self.dataset_index.fresh,
+                "series_datasets": sum(1 for index, _ in self._series_indexes.values() if index is not None),
+                "facet_datasets": len(self._facet_indexes),
+            },
+        }
+        if self.disk_cache is not None:
+            stats["disk_cache"] = self.disk_cache.stats()
+        return stats
 
     def get_providers(self):
-        url = f"{self.BASE_URL}/providers"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        providers = data.get("providers", {})
+        url = f"{self.base_url}/providers"
+        data = self._get_json(url, kind="providers", raise_errors=True)
+        providers = (data or {}).get("providers", {})
         return providers.get("docs", [])
 
     def get_datasets(self, search_term: str = None, limit: int = 100):
         if not search_term:
             return []
-        search_url = f"{self.BASE_URL}/search"
+        index = self.dataset_index
+        if index.fresh:
+            return index.search(search_term, limit)
+        if self.search_warmup:
+            self._warm_in_background("datasets", self.warm_dataset_index)
+        search_url = f"{self.base_url}/search"
         params = {
             "q": search_term,
             "limit": limit
         }
-        search_response = requests.get(search_url, params=params)
-        if search_response.status_code == 200:
-            search_data = search_response.json()
+        search_data = self._get_json(search_url, params=params, kind="search")
+        if search_data is not None:
             # Extract datasets from results.docs
             return search_data.get("results", {}).get("docs", [])
         return []
 
-    def get_series(self, provider_code: str, dataset_code: str, limit: int = 100, ref_area: str = None):
-        url = f"{self.BASE_URL}/series/{provider_code}/{dataset_code}"
+    @staticmethod
+    def _new_dataset_index():
+        return SearchIndex(
+            {"code": 3.0, "provider_code": 2.0, "name": 1.0, "provider_name": 1.0},
+            key=lambda doc: (doc.get("provider_code"), doc.get("code")),
+        )
+
+    def warm_dataset_index(self):
+        """Load every provider's dataset list into a new ``dataset_index``.
+
+        The new index replaces the current one only once complete, and is
+        used for the ``metadata`` cache TTL.
+        """
+        index = self._new_dataset_index()
+        for provider in self.get_providers():
+            code = provider.get("code")
+            if not code:
+                continue
+            url = f"{self.base_url}/datasets/{code}"
+            offset = 0
+            while True:
+                params = {"limit": self.DATASETS_PAGE_SIZE, "offset": offset}
+                data = self._get_json(url, params=params, kind="metadata", raise_errors=True)
+                page = (data or {}).get("datasets", {})
+                docs = page.get("docs", [])
+                index.add_many(
+                    {"provider_code": code, "provider_name": provider.get("name"), **doc} for doc in docs
+                )
+                offset += len(docs)
+                num_found = page.get("num_found")
+                if not docs or (num_found is not None and offset >= num_found):
+                    break
+        index.mark_complete(ttl=self.cache_ttls["metadata"])
+        self.dataset_index = index
+
+    def series_index(self, provider_code: str, dataset_code: str):
+        """Complete local search index of a dataset's series, or None if not loaded or expired."""
+        return self._cached_series_index(provider_code, dataset_code)[1]
+
+    def _cached_series_index(self, provider_code, dataset_code):
+        """``(known, index)``; ``known`` with a None index means the dataset is too large."""
+        key = (provider_code, dataset_code)
+        with self._search_lock:
+            entry = self._series_indexes.get(key)
+            if entry is None:
+                return False, None
+            index, expires = entry
+            if expires <= time.monotonic() or (index is not None and not index.fresh):
+                del self._series_indexes[key]
+                return False, None
+            self._series_indexes.move_to_end(key)
+            return True, index
+
+    def _keep_series_index(self, provider_code, dataset_code, index):
+        with self._search_lock:
+            key = (provider_code, dataset_code)
+            self._series_indexes[key] = (index, time.monotonic() + self.cache_ttls["series"])
+            self._series_indexes.move_to_end(key)
+            while len(self._series_indexes) > self.SEARCH_INDEX_DATASETS:
+                self._series_indexes.popitem(last=False)
+
+    def _index_series(self, provider_code, dataset_code, records):
+        """Keep ``records``, a dataset's whole series listing, as its search index."""
+        index = SearchIndex({"series_code": 2.0, "series_name": 1.0}, key=lambda doc: doc.get("series_code"))
+        index.add_many(records)
+        index.mark_complete(ttl=self.cache_ttls["series"])
+        self._keep_series_index(provider_code, dataset_code, index)
+
+    def warm_series_index(self, provider_code: str, dataset_code: str):
+        """Walk a dataset's series listing into a local search index.
+
+        Datasets with more than ``SEARCH_INDEX_MAX_SERIES`` series are left
+        to DBnomics' own search; that is remembered for the ``series`` TTL,
+        so they are not walked again on every search. Returns whether the
+        index was built.
+        """
+        series = self._walk_listing(provider_code, dataset_code, self.SEARCH_INDEX_MAX_SERIES)
+        records = [] if series is None else list(series)
+        if series is None or len(records) > self.SEARCH_INDEX_MAX_SERIES:
+            self._keep_series_index(provider_code, dataset_code, None)
+            return False
+        self._index_series(provider_code, dataset_code, records)
+        return True
+
+    def _walk_listing(self, provider_code, dataset_code, max_series):
+        """Lazily yield up to ``max_series + 1`` series of a dataset, or None if it is larger.
+
+        The first page's num_found tells whether the dataset is too large
+        before the rest of the listing is walked; the page itself is reused.
+        """
+        url = f"{self.base_url}/series/{provider_code}/{dataset_code}"
+        params = self.series_query_params(limit=self.SERIES_PAGE_MAX)
+        first = ((self._get_json(url, params=params, kind="series", raise_errors=True) or {})
+                 .get("series", {}))
+        docs, num_found = first.get("docs", []), first.get("num_found")
+        if num_found is not None and num_found > max_series:
+            return None
+        series = self.iter_flatten_series(docs)
+        if len(docs) == self.SERIES_PAGE_MAX and (num_found is None or num_found > len(docs)):
+            rest = self.iter_series(provider_code, dataset_code, offset=len(docs),
+                                    limit=max_series + 1 - len(docs))
+            series = chain(series, rest)
+        return series
+
+    def _warm_in_background(self, name, fn, *args):
+        """Run a search index warm-up once at a time, on its own daemon thread.
+
+        Warm-ups walk whole listings (and wait on the fetch pool for
+        prefetched pages), so they do not take a fetch worker themselves.
+        """
+        with self._search_lock:
+            if name in self._warming:
+                return
+            self._warming.add(name)
+
+        def warm():
+            _background.set(True)
+            try:
+                fn(*args)
+            except Exception:
+                # The index stays missing; searches keep going upstream
+                logger.warning("Search index warm-up %r failed", name, exc_info=True)
+            finally:
+                with self._search_lock:
+                    self._warming.discard(name)
+
+        threading.Thread(target=warm, name="dbnomics-search-warmup", daemon=True).start()
+
+    def get_facet_index(self, provider_code: str, dataset_code: str):
+        """Dimension facet index over a dataset's whole series listing.
+
+        The listing is walked once and the index kept for the ``series``
+        cache TTL, so successive facet queries are answered in memory.
+        Returns None for datasets of more than ``FACET_INDEX_MAX_SERIES``
+        series; that answer is kept for the same TTL.
+        """
+        key = (provider_code, dataset_code)
+        with self._search_lock:
+            entry = self._facet_indexes.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._facet_indexes.move_to_end(key)
+                return entry[0]
+        index = self.singleflight.do(("facets",) + key, lambda: self._build_facet_index(*key))
+        with self._search_lock:
+            self._facet_indexes[key] = (index, time.monotonic() + self.cache_ttls["series"])
+            self._facet_indexes.move_to_end(key)
+            while len(self._facet_indexes) > self.FACET_INDEX_DATASETS:
+                self._facet_indexes.popitem(last=False)
+        return index
+
+    def _build_facet_index(self, provider_code, dataset_code):
+        series = self._walk_listing(provider_code, dataset_code, self.FACET_INDEX_MAX_SERIES)
+        if series is None:
+            return None
+        listing = SeriesListing.from_records(series)
+        if len(listing) > self.FACET_INDEX_MAX_SERIES:
+            return None
+        if len(listing) <= self.SEARCH_INDEX_MAX_SERIES and self.series_index(provider_code, dataset_code) is None:
+            # The whole listing is at hand, so name searches can be served locally too
+            self._index_series(provider_code, dataset_code, listing.to_records())
+        return FacetIndex(listing)
+
+    def iter_datasets(self, search_term: str = None, limit: int = 100):
+        """Yield the datasets matching ``search_term`` while the search response downloads."""
+        if not search_term:
+            return
+        params = {
+            "q": search_term,
+            "limit": limit
+        }
+        yield from self._stream_docs(f"{self.base_url}/search", params, kind="search", path=("results", "docs"))
+
+    @staticmethod
+    def series_query_params(limit: int = 100, offset: int = 0, ref_area: str = None,
+                            dimensions: dict = None, q: str = None):
+        """Build DBnomics /series query params with filters applied upstream.
+
+        ``dimensions`` maps a dimension code to one value or a list of values
+        and is sent as the API's ``dimensions`` JSON filter; ``ref_area`` is a
+        shortcut for ``{"REF_AREA": [ref_area]}``.
+        """
+        filters = _filter_values(ref_area, dimensions)
         params = {"limit": limit}
-        if ref_area:
-            params["dimensions[REF_AREA]"] = ref_area
-        response = requests.get(url, params=params)
-        # print("Status:", response.status_code)
-        if response.status_code == 200:
-            data = response.json()
-            #print("Data:", data)
-            series_list = data.get("series", {}).get("docs", [])
-            #print("Series list:", series_list)
-            flat_series = self.flatten_series(series_list)
-            #print("Flat series:", flat_series)
-            return flat_series
-        return []
+        if offset:
+            params["offset"] = offset
+        if filters:
+            params["dimensions"] = json.dumps(filters, separators=(",", ":"), sort_keys=True)
+        if q:
+            params["q"] = q
+        return params
+
+    def get_series(self, provider_code: str, dataset_code: str, limit: int = 100, ref_area: str = None,
+                   dimensions: dict = None, offset: int = 0, q: str = None):
+        """Flattened series matching the filters, which are applied upstream."""
+        listing = self.get_series_listing(provider_code, dataset_code, limit=limit, ref_area=ref_area,
+                                          dimensions=dimensions, offset=offset, q=q)
+        return listing.to_records()
+
+    def get_series_listing(self, provider_code: str, dataset_code: str, limit: int = 100,
+                           ref_area: str = None, dimensions: dict = None, offset: int = 0,
+                           q: str = None):
+        """Columnar SeriesListing of the series matching the filters.
+
+        Listings of ``stream_threshold`` series or more are parsed as they
+        download, one document at a time, straight into the listing's
+        columns; a ``limit`` above DBnomics' ``SERIES_PAGE_MAX`` is fetched
+        page by page through ``iter_series`` instead of being cut to one
+        page. The filters are re-checked locally as a vectorized mask.
+        A ``q`` search on a dataset whose whole listing is indexed locally
+        (see ``series_index``) is answered without calling DBnomics.
+        """
+        if q:
+            known, index = self._cached_series_index(provider_code, dataset_code)
+            if index is not None:
+                # Ranked locally; the other filters apply to the matches
+                listing = SeriesListing.from_records(index.search(q))
+                return listing.filter(ref_area=ref_area, dimensions=dimensions)[offset:offset + limit]
+            if self.search_warmup and not known:
+                self._warm_in_background(
+                    ("series", provider_code, dataset_code), self.warm_series_index, provider_code, dataset_code
+                )
+        if limit > self.SERIES_PAGE_MAX:
+            listing = SeriesListing.from_records(self.iter_series(
+                provider_code, dataset_code, page_size=self.SERIES_PAGE_MAX, offset=offset, limit=limit,
+                ref_area=ref_area, dimensions=dimensions, q=q,
+            ))
+            # iter_series only stops short of the limit at the end of the listing
+            complete = len(listing) < limit
+        else:
+            url = f"{self.base_url}/series/{provider_code}/{dataset_code}"
+            params = self.series_query_params(limit=limit, offset=offset, ref_area=ref_area,
+                                              dimensions=dimensions, q=q)
+            num_found = None
+            if limit >= self.stream_threshold:
+                series_docs = self._stream_docs(url, params)
+            else:
+                data = self._get_json(url, params=params, kind="series")
+                series = (data or {}).get("series", {})
+                series_docs = series.get("docs", [])
+                num_found = series.get("num_found")
+            listing = SeriesListing.from_records(self.iter_flatten_series(series_docs))
+            # One page is the whole listing only if it stopped short of both the
+            # requested limit and DBnomics' own page cap, and the reported total
+            # (when there is one) agrees
+            complete = (
+                len(listing) < min(limit, self.SERIES_PAGE_MAX)
+                and (num_found is None or num_found == len(listing))
+            )
+        whole = (
+            not (q or ref_area or dimensions or offset)
+            and 0 < len(listing) <= self.SEARCH_INDEX_MAX_SERIES
+            and complete
+        )
+        if whole and self.series_index(provider_code, dataset_code) is None:
+            self._index_series(provider_code, dataset_code, listing.to_records())
+        return listing.filter(ref_area=ref_area, dimensions=dimensions)
+
+    def _stream_docs(self, url, params, kind="series", path=("series", "docs")):
+        """Yield the docs at ``path`` of a listing response while its body is parsed.
+
+        A fresh cached copy is used instead when there is one, and the stale
+        fallbacks of ``_get_json`` apply. Streamed responses are not cached.
+        """
+        key = (url, tuple(sorted(params.items())))
+        cached = self.cache.lookup(key)
+        data = MISSING
+        if cached is not None and cached[1] > 0:
+            data = cached[0]
+        elif not self.breaker.allow():
+            data = self._stale_copy(cached, url, params, kind)
+            if data is MISSING:
+                raise CircuitOpenError(f"DBnomics circuit open; no cached copy of {url}")
+            data = self._serve_stale(data, key, url, params, kind)
+        if data is MISSING:
+            try:
+                response = self._get_recorded(url, params=params, stream=True)
+                if response.status_code >= 500:
+                    response.close()  # frees the upstream slot held by the stream
+                    response.raise_for_status()
+            except (requests.RequestException, RateLimitTimeout) as exc:
+                data = self._stale_copy(cached, url, params, kind)
+                if data is MISSING:
+                    if isinstance(exc, requests.HTTPError):
+                        return
+                    raise
+                data = self._serve_stale(data, key, url, params, kind)
+            else:
+                try:
+                    if response.status_code == 200:
+                        yield from iter_response_items(response, path)
+                finally:
+                    response.close()
+                return
+        for name in path[:-1]:
+            data = (data or {}).get(name, {})
+        yield from (data or {}).get(path[-1], [])
+
+    def iter_series(self, provider_code: str, dataset_code: str, page_size: int = 1000, offset: int = 0,
+                    limit: int = None, ref_area: str = None, dimensions: dict = None, q: str = None):
+        """Lazily walk a dataset's series listing page by page.
+
+        Flattened series documents are yielded as each ``offset``/``limit``
+        page arrives, while the next page is already being fetched on the
+        client's worker pool. Only the current and the prefetched page are
+        held in memory. ``limit`` caps the total number of series yielded.
+        """
+        url = f"{self.base_url}/series/{provider_code}/{dataset_code}"
+        page_size = max(1, min(page_size, self.SERIES_PAGE_MAX))
+        remaining = limit
+
+        def fetch(page_offset, count):
+            params = self.series_query_params(limit=count, offset=page_offset, ref_area=ref_area,
+                                              dimensions=dimensions, q=q)
+            data = self._get_json(url, params=params, kind="series", raise_errors=True)
+            series = (data or {}).get("series", {})
+            return series.get("docs", []), series.get("num_found")
+
+        if remaining is not None and remaining <= 0:
+            return
+        count = page_size if remaining is None else min(page_size, remaining)
+        docs, num_found = fetch(offset, count)
+        while True:
+            offset += len(docs)
+            if remaining is not None:
+                remaining -= len(docs)
+            more = (
+                len(docs) == count
+                and (remaining is None or remaining > 0)
+                and (num_found is None or offset < num_found)
+            )
+            pending = None
+            if more:
+                count = page_size if remaining is None else min(page_size, remaining)
+                pending = self._get_executor().submit(
+                    contextvars.copy_context().run, fetch, offset, count
+                )
+            for doc in docs:
+                yield self._flatten_doc(doc)
+            if pending is None:
+                return
+            docs, num_found = pending.result()
 
     def flatten_series(self, series_docs):
         #print(f"flatten_series called with {len(series_docs)} docs")
-        flat = []
-        for doc in series_docs:
-            flat_doc = {
-                "series_code": doc.get("series_code"),
-                "series_name": doc.get("series_name"),
-                "dataset_code": doc.get("dataset_code"),
-                "dataset_name": doc.get("dataset_name"),
-                "provider_code": doc.get("provider_code"),
-            }
-            # Add dimensions as top-level keys
-            for dim_key, dim_val in doc.get("dimensions", {}).items():
-                flat_doc[dim_key] = dim_val
-            flat.append(flat_doc)
+        flat = list(self.iter_flatten_series(series_docs))
         #print(f"Returning {len(flat)} flattened series")
         return flat
 
+    def iter_flatten_series(self, series_docs):
+        """Flatten series docs one at a time, e.g. as a stream is parsed."""
+        for doc in series_docs:
+            yield self._flatten_doc(doc)
+
+    @staticmethod
+    def _flatten_doc(doc):
+        flat_doc = {
+            "series_code": doc.get("series_code"),
+            "series_name": doc.get("series_name"),
+            "dataset_code": doc.get("dataset_code"),
+            "dataset_name": doc.get("dataset_name"),
+            "provider_code": doc.get("provider_code"),
+        }
+        # Add dimensions as top-level keys
+        for dim_key, dim_val in doc.get("dimensions", {}).items():
+            flat_doc[dim_key] = dim_val
+        return flat_doc
+
     def get_ref_area_map(self, provider_code: str, dataset_code: str):
-        url = f"{self.BASE_URL}/datasets/{provider_code}/{dataset_code}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        url = f"{self.base_url}/datasets/{provider_code}/{dataset_code}"
+        data = self._get_json(url, kind="metadata")
+        if data is not None:
             datasets = data.get("datasets", [])
             if isinstance(datasets, list) and datasets and "REF_AREA" in datasets[0]:
                 return datasets[0]["REF_AREA"]
@@ -76,10 +730,9 @@ class DBNomicsClient:
         return {}
 
     def get_dataset_metadata(self, provider_code: str, dataset_code: str):
-        url = f"{self.BASE_URL}/datasets/{provider_code}/{dataset_code}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        url = f"{self.base_url}/datasets/{provider_code}/{dataset_code}"
+        data = self._get_json(url, kind="metadata")
+        if data is not None:
             datasets = data.get("datasets", {})
             #print("DEBUG: datasets type:", type(datasets), "value (truncated):", str(datasets)[:500])
             # If datasets is a dict with 'docs', get the first doc
@@ -93,39 +746,205 @@ class DBNomicsClient:
                 return datasets[0]
         return {}
 
-    def get_multi_series_aligned(self, provider, dataset, freq, ref_area, indicators):
+    def _fetch_series_doc(self, provider, dataset, series_id, observations=True, revalidate=False):
+        """Fetch one series document, or None if DBnomics has no such series."""
+        url = f"{self.base_url}/series/{provider}/{dataset}/{series_id}"
+        params = {"format": "json", "observations": int(observations)}
+        # print("Fetching:", url)
+        data = self._get_json(url, params=params, kind="observations", revalidate=revalidate) or {}
+        # print("Raw API response for", series_id, ":", data)
+        docs = data.get("series", {}).get("docs", [])
+        if not docs:
+            # print(f"No docs for {series_id}")
+            return None
+        return docs[0]
+
+    @staticmethod
+    def _doc_observations(doc):
+        periods = doc.get("periods") or doc.get("period") or doc.get("period_start_day") or []
+        values = doc.get("values") or doc.get("value") or []
+        min_len = min(len(periods), len(values))
+        periods = periods[:min_len]
+        values = values[:min_len]
+        if not periods or not values:
+            return None
+        return periods, values
+
+    def _map_concurrent(self, fn, items):
+        """Run ``fn`` over ``items`` on the shared pool, keeping input order."""
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        executor = self._get_executor()
+        # Each task runs in a copy of the caller's context so request-scoped
+        # state (e.g. track_staleness) follows the work onto the pool
+        futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="dbnomics-fetch"
+                )
+            return self._executor
+
+    def _get_refresh_executor(self):
+        with self._executor_lock:
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=self.REFRESH_WORKERS, thread_name_prefix="dbnomics-refresh"
+                )
+            return self._refresh_executor
+
+    def _fetch_series_docs_batch(self, provider, dataset, series_codes, observations=True, revalidate=False):
+        """Fetch several series of one dataset with a single series_ids request.
+
+        Returns a dict of series_code -> doc; codes missing from the response
+        map to None.
+        """
+        params = {
+            "series_ids": ",".join(f"{provider}/{dataset}/{code}" for code in series_codes),
+            "observations": int(observations),
+            "format": "json",
+            "limit": len(series_codes),
+        }
+        data = self._get_json(
+            f"{self.base_url}/series", params=params, kind="observations", raise_errors=True,
+            revalidate=revalidate,
+        ) or {}
+        docs = data.get("series", {}).get("docs", [])
+        found = {doc.get("series_code"): doc for doc in docs}
+        return {code: found.get(code) for code in series_codes}
+
+    def _fetch_series_docs(self, provider, dataset, series_codes, observations=True, revalidate=False):
+        """Fetch series documents for ``series_codes`` as chunked batch requests.
+
+        A chunk whose batch request fails is retried one series at a time, so
+        a single bad id or an oversized request does not lose the others.
+        ``revalidate`` is passed on to ``_get_json``.
+        """
+        series_codes = list(dict.fromkeys(series_codes))
+        if self.batch_size == 1 or len(series_codes) == 1:
+            results = self._map_concurrent(
+                lambda code: self._fetch_series_doc(provider, dataset, code, observations, revalidate),
+                series_codes,
+            )
+            return dict(zip(series_codes, results))
+
+        def fetch_chunk(chunk):
+            try:
+                return self._fetch_series_docs_batch(provider, dataset, chunk, observations, revalidate)
+            except (requests.RequestException, ValueError):
+                return {
+                    code: self._fetch_series_doc(provider, dataset, code, observations, revalidate)
+                    for code in chunk
+                }
+
+        chunks = [
+            series_codes[i:i + self.batch_size]
+            for i in range(0, len(series_codes), self.batch_size)
+        ]
+        docs = {}
+        for result in self._map_concurrent(fetch_chunk, chunks):
+            docs.update(result)
+        return docs
+
+    def _fetch_series_set(self, provider, dataset, series_codes):
+        """Return series_code -> ``(periods, values)`` (or None) for ``series_codes``.
+
+        With a local series store, stored copies are served directly while
+        they are within the store's check interval. Older ones are checked
+        with one observation-free request, and only series whose
+        ``indexed_at`` changed upstream are downloaded again. Both requests
+        bypass the response caches (see ``revalidate`` in ``_get_json``), so
+        a cached copy cannot hide or undo an upstream change. When DBnomics
+        cannot be reached, stored copies are served and flagged as stale
+        (see ``track_staleness``); only series never stored raise.
+        """
+        series_codes = list(dict.fromkeys(series_codes))
+        store = self.series_store
+        if store is None:
+            docs = self._fetch_series_docs(provider, dataset, series_codes)
+            return {
+                code: self._doc_observations(doc) if doc else None
+                for code, doc in docs.items()
+            }
+
+        results = {}
+        to_check = []
+        for code in series_codes:
+            stored = store.read(provider, dataset, code) if store.is_fresh(provider, dataset, code) else None
+            if stored is not None:
+                results[code] = stored
+            else:
+                to_check.append(code)
+        if not to_check:
+            return results
+
+        changed = to_check
+        unreachable = []  # stored series that could not be checked or downloaded
+        known = {code: store.indexed_at(provider, dataset, code) for code in to_check}
+        known = {code: indexed_at for code, indexed_at in known.items() if indexed_at}
+        if known:
+            try:
+                current = self._fetch_series_docs(provider, dataset, list(known), observations=False,
+                                                  revalidate=True)
+            except (requests.RequestException, RateLimitTimeout):
+                current = None
+            unchanged = []
+            for code, indexed_at in known.items():
+                doc = (current or {}).get(code)
+                if doc and doc.get("indexed_at") == indexed_at:
+                    stored = store.read(provider, dataset, code)
+                    if stored is not None:
+                        results[code] = stored
+                        unchanged.append(code)
+            store.mark_checked(provider, dataset, unchanged)
+            changed = [code for code in to_check if code not in results]
+            if current is None:
+                # DBnomics is unreachable; do not retry it for the checked series
+                unreachable = [code for code in changed if code in known]
+                changed = [code for code in changed if code not in known]
+
+        try:
+            docs = self._fetch_series_docs(provider, dataset, changed, revalidate=True) if changed else {}
+        except (requests.RequestException, RateLimitTimeout):
+            stored = {code: store.read(provider, dataset, code) for code in changed}
+            if any(observations is None for observations in stored.values()):
+                raise
+            unreachable += changed
+            docs, changed = {}, []
+        for code in unreachable:
+            results[code] = store.read(provider, dataset, code)
+            self._flag_stale(f"{self.base_url}/series/{provider}/{dataset}/{code}")
+        downloaded = []
+        for code in changed:
+            doc = docs.get(code)
+            observations = self._doc_observations(doc) if doc else None
+            if observations is not None:
+                downloaded.append((code, *observations, doc.get("indexed_at")))
+            results[code] = observations
+        store.write_many(provider, dataset, downloaded)
+        return results
+
+    def get_multi_series_aligned(self, provider, dataset, freq, ref_area, indicators, output="records",
+                                 start: str = None, end: str = None):
+        """Indicators for one frequency and area, aligned on their shared periods.
+
+        ``output`` is ``"records"`` (one dict per period), ``"frame"`` (a
+        DataFrame indexed by date) or ``"columns"`` (a dict of lists).
+        Indicators with no data are left out. ``start``/``end`` are period
+        labels (e.g. ``1990-01-01``, ``2020-Q4``); only periods starting
+        within that range are aligned and returned.
+        """
         # print("Fetching series directly for:", indicators)
-        base_url = f"{self.BASE_URL}/series/{provider}/{dataset}/"
-        dfs = []
-        for ind in indicators:
-            series_id = f"{freq}.{ref_area}.{ind}"
-            url = base_url + series_id
-            params = {"format": "json", "observations": 1}
-            # print("Fetching:", url)
-            resp = requests.get(url, params=params)
-            # print("Final requested URL:", resp.url)
-            data = resp.json()
-            # print("Raw API response for", series_id, ":", data)
-            docs = data.get("series", {}).get("docs", [])
-            if not docs:
-                # print(f"No docs for {series_id}")
-                continue
-            doc = docs[0]
-            periods = doc.get("periods") or doc.get("period") or doc.get("period_start_day") or []
-            values = doc.get("values") or doc.get("value") or []
-            min_len = min(len(periods), len(values))
-            periods = periods[:min_len]
-            values = values[:min_len]
-            if not periods or not values:
-                # print(f"No data for {series_id}")
-                continue
-            df = pd.DataFrame({"date": periods, ind: values})
-            dfs.append(df)
-        if not dfs:
-            return []
-        df_merged = dfs[0]
-        for df in dfs[1:]:
-            df_merged = pd.merge(df_merged, df, on="date", how="outer")
-        df_merged = df_merged.sort_values("date")
-        # print("Returning records:", df_merged.to_dict(orient="records"))
-        return df_merged.to_dict(orient="records")
\ No newline at end of file
+        first = period_bounds(start)[0] if start else None
+        last = period_bounds(end)[1] if end else None
+        indicators = list(indicators)
+        series_codes = {ind: f"{freq}.{ref_area}.{ind}" for ind in indicators}
+        observations = self._fetch_series_set(provider, dataset, series_codes.values())
+        aligned = align_series(
+            {ind: observations.get(series_codes[ind]) for ind in indicators}, first=first, last=last
+        )
+        return aligned.to_output(output)
@@ -0,0 +1,107 @@
+"""Global upstream rate limit and concurrency budget."""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimitTimeout(TimeoutError):
+    """No upstream slot became available before the caller's deadline."""
+
+
+class RateLimiter:
+    """Token bucket plus max-in-flight semaphore around upstream calls.
+
+    Callers queue rather than fail: ``slot()`` waits for a free connection
+    slot and a token until the deadline, then raises RateLimitTimeout. Time
+    spent queueing and time spent upstream are accounted separately.
+    """
+
+    def __init__(self, rate: float = 20.0, burst: int = 40, max_in_flight: int = 16,
+                 timeout: float = 15.0):
+        self.rate = rate  # tokens per second; 0 disables the bucket
+        self.burst = max(1, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._counters = {
+            "acquired": 0,
+            "timeouts": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+            "upstream_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build a limiter from ``DBNOMICS_*`` environment variables."""
+        env = os.environ
+        return cls(
+            rate=float(env.get("DBNOMICS_RATE_LIMIT", 20)),
+            burst=int(env.get("DBNOMICS_RATE_BURST", 40)),
+            max_in_flight=int(env.get("DBNOMICS_MAX_IN_FLIGHT", 16)),
+            timeout=float(env.get("DBNOMICS_QUEUE_TIMEOUT", 15)),
+        )
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """Hold one upstream slot for the duration of the block."""
+        start = time.monotonic()
+        deadline = start + (self.timeout if timeout is None else timeout)
+        if not self._semaphore.acquire(timeout=max(0.0, deadline - start)):
+            self._timed_out()
+        try:
+            self._take_token(deadline)
+        except RateLimitTimeout:
+            self._semaphore.release()
+            raise
+        acquired = time.monotonic()
+        with self._lock:
+            waited = acquired - start
+            self._in_flight += 1
+            self._counters["acquired"] += 1
+            self._counters["queue_wait_seconds"] += waited
+            self._counters["max_queue_wait_seconds"] = max(
+                self._counters["max_queue_wait_seconds"], waited
+            )
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._counters["upstream_seconds"] += time.monotonic() - acquired
+            self._semaphore.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = self._in_flight
+        stats["rate"] = self.rate
+        stats["max_in_flight"] = self.max_in_flight
+        return stats
+
+    def _take_token(self, deadline):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                self._timed_out()
+            time.sleep(wait)
+
+    def _timed_out(self):
+        with self._lock:
+            self._counters["timeouts"] += 1
+        raise RateLimitTimeout("timed out waiting for an upstream DBnomics slot")
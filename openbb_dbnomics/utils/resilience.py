@@ -0,0 +1,90 @@
+"""Circuit breaker guarding upstream DBnomics calls."""
+
+import threading
+import time
+
+import requests
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """The breaker is open and no cached copy was available to serve."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by consecutive upstream failures.
+
+    After ``failure_threshold`` failures in a row the breaker opens and
+    ``allow()`` refuses calls, so requests fail (or serve stale data) at once
+    instead of waiting on a dead upstream. After ``reset_timeout`` seconds a
+    single probe is let through; its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._counters = {"trips": 0, "rejected": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def allow(self):
+        """True if a call may go upstream now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and (
+                not self._probe_in_flight or now - self._probe_started >= self.reset_timeout
+            ):
+                # A probe that never reported back does not wedge the breaker
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counters["trips"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["state"] = self._state
+            stats["consecutive_failures"] = self._failures
+        return stats
+
+
+def is_upstream_failure(exc):
+    """True for errors that mean DBnomics itself is unavailable (not a 4xx)."""
+    if isinstance(exc, requests.HTTPError):
+        response = exc.response
+        return response is None or response.status_code >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout))
@@ -0,0 +1,142 @@
+"""In-process full-text index over dataset and series metadata.
+
+Documents are split into lowercase alphanumeric tokens (``NGDP_SA_XDC`` gives
+``ngdp``, ``sa`` and ``xdc``) and every token maps to the documents holding
+it, with the weight of the best field it appears in. A query matches the
+documents containing every query term, either as a whole token or as a
+token prefix (so ``infl`` finds ``inflation`` while typing), and results
+are ranked by field weight and term rarity.
+"""
+
+import bisect
+import math
+import re
+import threading
+import time
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+# Score factor for a term that only matches as the prefix of a token
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text) -> list:
+    """Lowercase alphanumeric tokens of ``text``."""
+    return _TOKEN.findall(str(text).casefold()) if text else []
+
+
+class SearchIndex:
+    """Inverted index over ``{field: weight}`` text fields of dict documents.
+
+    Whoever loads the index calls ``mark_complete`` once it holds the whole
+    collection (e.g. every series of a dataset). Only while it is ``fresh``,
+    i.e. complete and not past its TTL, can a query be answered locally
+    instead of upstream.
+    """
+
+    def __init__(self, fields: dict, key=None):
+        self.fields = dict(fields)
+        # Identity of a document; adding a document with a known key replaces it
+        self.key = key or (lambda doc: tuple(doc.get(field) for field in self.fields))
+        self.complete = False
+        self.expires = None  # time.monotonic() deadline set by mark_complete
+        self._lock = threading.Lock()
+        self._docs = []
+        self._positions = {}
+        self._doc_tokens = []
+        self._postings = {}
+        self._terms = None  # sorted vocabulary, rebuilt on the first search after a change
+
+    def __len__(self):
+        return len(self._positions)
+
+    def mark_complete(self, ttl: float = None):
+        """Flag the index as holding the whole collection, for ``ttl`` seconds if given."""
+        self.expires = None if ttl is None else time.monotonic() + ttl
+        self.complete = True
+
+    @property
+    def fresh(self):
+        return self.complete and (self.expires is None or time.monotonic() < self.expires)
+
+    def add(self, doc):
+        self.add_many([doc])
+
+    def add_many(self, docs):
+        with self._lock:
+            for doc in docs:
+                self._add(doc)
+
+    def _add(self, doc):
+        weights = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(doc.get(field)):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        key = self.key(doc)
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self._docs)
+            self._positions[key] = position
+            self._docs.append(doc)
+            self._doc_tokens.append(weights)
+        else:
+            for token in self._doc_tokens[position]:
+                del self._postings[token][position]
+            self._docs[position] = doc
+            self._doc_tokens[position] = weights
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[position] = weight
+        self._terms = None
+
+    def _matches(self, term, terms):
+        """``{position: score}`` of documents with a token equal to or starting with ``term``."""
+        matches = {}
+        exact = self._postings.get(term)
+        if exact:
+            matches.update(exact)
+        start = bisect.bisect_left(terms, term)
+        for token in terms[start:]:
+            if not token.startswith(term):
+                break
+            if token == term:
+                continue
+            for position, weight in self._postings[token].items():
+                score = weight * PREFIX_FACTOR
+                if score > matches.get(position, 0.0):
+                    matches[position] = score
+        return matches
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Documents matching every term of ``query``, best first.
+
+        Each term scores its best field weight (halved for a prefix match)
+        times its inverse document frequency; ties keep insertion order.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            if self._terms is None:
+                self._terms = sorted(token for token, postings in self._postings.items() if postings)
+            vocabulary = self._terms
+            total = len(self._positions)
+            scores = None
+            # Rarest-looking terms first, so the candidate set shrinks fast
+            for term in sorted(terms, key=len, reverse=True):
+                matches = self._matches(term, vocabulary)
+                if not matches:
+                    return []
+                idf = math.log(1.0 + total / len(matches))
+                if scores is None:
+                    scores = {position: score * idf for position, score in matches.items()}
+                else:
+                    scores = {
+                        position: total_score + matches[position] * idf
+                        for position, total_score in scores.items() if position in matches
+                    }
+                    if not scores:
+                        return []
+            ranked = sorted(scores, key=lambda position: (-scores[position], position))
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [self._docs[position] for position in ranked]
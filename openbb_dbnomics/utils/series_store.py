@@ -0,0 +1,176 @@
+"""Local Parquet store of series observations, partitioned by provider/dataset."""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+
+class SeriesStore:
+    """Observations kept as one Parquet file per series.
+
+    Layout::
+
+        <root>/<provider>/<dataset>/<series_code>.parquet
+        <root>/<provider>/<dataset>/manifest.json
+
+    The manifest records each series' upstream ``indexed_at`` and when it was
+    last checked, which is what lets DBNomicsClient refresh incrementally:
+    series checked within ``check_interval`` seconds are served as-is, and
+    older ones are only re-downloaded if DBnomics re-indexed them.
+    """
+
+    def __init__(self, root: str, check_interval: float = 900.0):
+        if pa is None:
+            raise ImportError("SeriesStore requires pyarrow (pip install pyarrow)")
+        self.root = root
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._manifests = {}
+        self._counters = {"reads": 0, "writes": 0, "checks_skipped": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a store under ``$DBNOMICS_STORE_DIR``; None if unset or pyarrow is missing."""
+        root = os.environ.get("DBNOMICS_STORE_DIR")
+        if not root or pa is None:
+            return None
+        interval = float(os.environ.get("DBNOMICS_STORE_CHECK_INTERVAL", 900))
+        return cls(os.path.expanduser(root), check_interval=interval)
+
+    def is_fresh(self, provider, dataset, code):
+        """True if ``code`` is stored and was checked upstream recently."""
+        entry = self._manifest(provider, dataset).get(code)
+        fresh = entry is not None and time.time() - entry["checked_at"] < self.check_interval
+        if fresh:
+            self._count("checks_skipped")
+        return fresh
+
+    def indexed_at(self, provider, dataset, code):
+        entry = self._manifest(provider, dataset).get(code)
+        return entry.get("indexed_at") if entry else None
+
+    def read(self, provider, dataset, code):
+        """Return the stored ``(periods, values)`` for ``code``, or None."""
+        path = self._series_path(provider, dataset, code)
+        if not os.path.exists(path):
+            return None
+        table = pq.read_table(path)
+        self._count("reads")
+        return table.column("period").to_pylist(), table.column("value").to_pylist()
+
+    def write(self, provider, dataset, code, periods, values, indexed_at=None):
+        self.write_many(provider, dataset, [(code, periods, values, indexed_at)])
+
+    def write_many(self, provider, dataset, series):
+        """Store ``(code, periods, values, indexed_at)`` tuples, then save the manifest once."""
+        entries = {}
+        for code, periods, values, indexed_at in series:
+            values = [_to_float(v) for v in values]
+            table = pa.table({
+                "period": pa.array([str(p) for p in periods], type=pa.string()),
+                "value": pa.array(values, type=pa.float64()),
+            })
+            path = self._series_path(provider, dataset, code)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _replace(path, lambda tmp_path: pq.write_table(table, tmp_path))
+            entries[code] = {"indexed_at": indexed_at, "checked_at": time.time()}
+        if not entries:
+            return
+        with self._lock:
+            manifest = self._load_manifest(provider, dataset)
+            manifest.update(entries)
+            self._save_manifest(provider, dataset, manifest)
+            self._counters["writes"] += len(entries)
+
+    def mark_checked(self, provider, dataset, codes):
+        """Record that ``codes`` were found unchanged upstream just now."""
+        if not codes:
+            return
+        now = time.time()
+        with self._lock:
+            manifest = self._load_manifest(provider, dataset)
+            for code in codes:
+                if code in manifest:
+                    manifest[code]["checked_at"] = now
+            self._save_manifest(provider, dataset, manifest)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _partition(self, provider, dataset):
+        return os.path.join(self.root, quote(provider, safe=""), quote(dataset, safe=""))
+
+    def _series_path(self, provider, dataset, code):
+        return os.path.join(self._partition(provider, dataset), f"{quote(code, safe='')}.parquet")
+
+    def _manifest(self, provider, dataset):
+        with self._lock:
+            return self._load_manifest(provider, dataset)
+
+    def _load_manifest(self, provider, dataset):
+        # Caller holds self._lock
+        key = (provider, dataset)
+        if key not in self._manifests:
+            path = os.path.join(self._partition(provider, dataset), "manifest.json")
+            try:
+                with open(path) as f:
+                    self._manifests[key] = json.load(f)
+            except (OSError, ValueError):
+                self._manifests[key] = {}
+        return self._manifests[key]
+
+    def _save_manifest(self, provider, dataset, manifest):
+        # Caller holds self._lock
+        partition = self._partition(provider, dataset)
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, "manifest.json")
+
+        def dump(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+
+        _replace(path, dump)
+
+
+def _replace(path, write):
+    """Atomically replace ``path`` with what ``write(tmp_path)`` produces.
+
+    Every call gets its own temporary file, so concurrent writers of the same
+    path never interleave; the last ``os.replace`` wins.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _to_float(value):
+    # DBnomics marks missing observations as "NA"
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
@@ -0,0 +1,74 @@
+"""Request coalescing: concurrent callers for the same key share one call."""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls by key.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for and share its result (or exception). Sync callers and
+    coroutines share one key space, so a threadpool-run endpoint and an async
+    one asking for the same resource still trigger a single upstream call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless a call for ``key`` is already in flight."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(key)
+
+    async def do_async(self, key, coro_fn):
+        """Await ``coro_fn()`` unless a call for ``key`` is already in flight."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coro_fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+    def _join(self, key):
+        with self._lock:
+            self._counters["calls"] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._counters["executions"] += 1
+            return future, True
+
+    def _leave(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
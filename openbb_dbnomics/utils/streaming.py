@@ -0,0 +1,180 @@
+"""Incremental parsing of large DBnomics responses.
+
+``iter_response_items`` yields the elements of one array inside a response
+body (e.g. ``series.docs``) while the body is still downloading, so only one
+element is materialized at a time. It uses ijson when installed and a small
+chunked parser built on the stdlib decoder otherwise.
+"""
+
+import codecs
+import json
+import re
+
+try:
+    import ijson
+except ImportError:  # optional dependency
+    ijson = None
+
+_WHITESPACE = " \t\n\r"
+
+# Characters the value scanner stops at: inside containers, inside strings,
+# and after a number or literal
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[\s,\]}]")
+
+
+def iter_response_items(response, path, chunk_size: int = 64 * 1024):
+    """Yield the items of the array at ``path`` in a streamed ``response``.
+
+    ``path`` is a sequence of object keys, e.g. ``("series", "docs")``. The
+    response must have been requested with ``stream=True``.
+    """
+    if ijson is not None:
+        response.raw.decode_content = True
+        yield from ijson.items(response.raw, ".".join(path) + ".item", use_float=True)
+    else:
+        yield from iter_json_items(response.iter_content(chunk_size), path)
+
+
+def iter_json_items(chunks, path):
+    """Yield the items of the array at ``path`` from an iterable of byte chunks.
+
+    Objects on the way are scanned key by key; values before the target are
+    skipped and parsing stops once the array ends, so the rest of the body is
+    never decoded.
+    """
+    yield from _walk(_Reader(chunks), tuple(path))
+
+
+def _walk(reader, path):
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == path[0]:
+            if len(path) == 1 and reader.peek() == "[":
+                yield from _items(reader)
+            elif len(path) > 1 and reader.peek() == "{":
+                yield from _walk(reader, path[1:])
+            return
+        reader.value()
+        if reader.expect(",}") == "}":
+            return
+
+
+def _items(reader):
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",]") == "]":
+            return
+
+
+class _Reader:
+    """Text buffer over byte chunks that decodes one JSON value at a time."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Append the next chunk, dropping consumed text; False at end of body."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                self.text = self.text[self.pos:] + self._utf8.decode(chunk)
+                self.pos = 0
+                return True
+        self.text = self.text[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON document, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next value, once the whole of it has been read."""
+        self.peek()
+        self._value_end()
+        value, self.pos = self._raw_decode(self.text, self.pos)
+        return value
+
+    def _value_end(self):
+        """Read chunks until the value at ``pos`` is complete; return its end.
+
+        Strings and containers are matched by skipping from one quote,
+        backslash or bracket to the next, and the scan resumes where it
+        stopped when a chunk arrives, so a value costs time linear in its
+        length however many chunks it spans. A number or literal ends at the
+        next delimiter, or at the end of the body.
+        """
+        scalar = self.text[self.pos] not in '{["'
+        scanned = 0  # characters past pos already scanned; pos moves on _fill
+        depth, in_string = 0, False
+        while True:
+            text = self.text
+            i = self.pos + scanned
+            if scalar:
+                match = _SCALAR_END.search(text, i)
+                if match:
+                    return match.start()
+                i = len(text)
+            else:
+                while i < len(text):
+                    if in_string:
+                        match = _STRING_END.search(text, i)
+                        if match is None:
+                            i = len(text)
+                        elif match.group() == "\\":
+                            if match.end() == len(text):
+                                i = match.start()  # escaped character not read yet
+                                break
+                            i = match.end() + 1
+                        else:
+                            i, in_string = match.end(), False
+                            if depth == 0:
+                                return i
+                        continue
+                    match = _STRUCTURE.search(text, i)
+                    if match is None:
+                        i = len(text)
+                        continue
+                    char, i = match.group(), match.end()
+                    if char == '"':
+                        in_string = True
+                    elif char in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            return i
+            scanned = i - self.pos
+            if not self._fill():
+                if scalar:
+                    return len(self.text)
+                raise ValueError("Unexpected end of JSON document")
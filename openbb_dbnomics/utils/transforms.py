@@ -0,0 +1,167 @@
+"""Frequency-aware transformations of aligned series.
+
+Every transform works on all columns at once as a NumPy matrix operation.
+Year-on-year and quarter-on-quarter changes compare each row with the row
+dated one year (three months) earlier, so a missing period yields NaN
+rather than a comparison with the wrong period; other lags are counted in
+rows, derived from the data frequency where needed.
+"""
+
+import numpy as np
+import pandas as pd
+
+from openbb_dbnomics.utils.periods import UNKNOWN, period_frequency, period_ordinals
+
+# Observations per year by DBnomics frequency code (B = business days)
+PERIODS_PER_YEAR = {"A": 1, "S": 2, "Q": 4, "M": 12, "W": 52, "B": 260, "D": 365}
+
+# How many days the matching earlier period may start from the target date,
+# either way: weekly periods fall on a different day each year (52 weeks is
+# 364 days) and business days skip weekends; other frequencies match exactly
+_LAG_TOLERANCE_DAYS = {52: 3, 260: 3}
+
+# Months spanned by the date-based changes
+_CHANGE_MONTHS = {"yoy": 12, "qoq": 3}
+
+# Chart title suffix and y-axis units for each transform
+TRANSFORMS = {
+    "level": (None, None),
+    "yoy": ("Year-on-Year % Change", "YoY %"),
+    "qoq": ("Quarter-on-Quarter % Change", "QoQ %"),
+    "pop": ("Period-on-Period % Change", "PoP %"),
+    "diff": ("Change in Levels", "Change"),
+    "logdiff": ("Log Difference x100", "Log diff x100"),
+    "annualized": ("Annualized % Growth", "Annualized %"),
+    "rebase": ("Rebased, first observation = 100", "Index"),
+    "rolling": ("Rolling Mean", None),
+}
+
+
+def periods_per_year(freq: str = None, index=None) -> int:
+    """Observations per year for ``freq``, else inferred from the first label of ``index``."""
+    code = (freq or "").upper()
+    if code not in PERIODS_PER_YEAR and index is not None and len(index):
+        code = period_frequency(str(index[0])) or ""
+    return PERIODS_PER_YEAR.get(code, 1)
+
+
+def validate_change(change: str, freq: str = None):
+    """Raise ValueError if ``change`` is unknown or meaningless for ``freq``."""
+    if change not in TRANSFORMS:
+        raise ValueError(f"Unknown change {change!r}; expected one of {', '.join(TRANSFORMS)}")
+    if change == "qoq" and (freq or "").upper() in ("A", "S"):
+        raise ValueError(f"qoq needs quarterly or more frequent data, not frequency {freq!r}")
+
+
+def _lagged(matrix, lag):
+    shifted = np.full_like(matrix, np.nan)
+    if lag < len(matrix):
+        shifted[lag:] = matrix[:len(matrix) - lag]
+    return shifted
+
+
+def _lag_rows(dates, months, tolerance=0):
+    """Row dated ``months`` earlier than each row of ``dates``, or -1 if none.
+
+    ``dates`` are day ordinals (see ``periods.period_ordinals``). The row
+    starting nearest the target day matches if it is at most ``tolerance``
+    days away (the earlier one on a tie); month ends are clamped (a 29
+    February looks for 28 February).
+    """
+    dates = np.asarray(dates, dtype=np.int64)
+    rows = np.full(len(dates), -1, dtype=np.int64)
+    known = np.flatnonzero(dates != UNKNOWN)
+    if not len(known):
+        return rows
+    days = dates[known].astype("datetime64[D]")
+    month = days.astype("datetime64[M]")
+    day_of_month = days - month.astype("datetime64[D]")
+    start = (month - months).astype("datetime64[D]")
+    last_day = (month - months + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+    target = np.minimum(start + day_of_month, last_day).astype(np.int64)
+    order = known[np.argsort(dates[known], kind="stable")]
+    ordered = dates[order]
+    # Candidates: the last row before the target and the first one on or after it
+    after = np.searchsorted(ordered, target, side="left")
+    before = after - 1
+    after_gap = np.where(after < len(ordered), ordered[np.minimum(after, len(ordered) - 1)] - target, np.inf)
+    before_gap = np.where(before >= 0, target - ordered[np.maximum(before, 0)], np.inf)
+    nearest = np.where(before_gap <= after_gap, before, after)
+    valid = np.minimum(before_gap, after_gap) <= tolerance
+    rows[known[valid]] = order[nearest[valid]]
+    return rows
+
+
+def _lagged_rows(matrix, rows):
+    shifted = np.full_like(matrix, np.nan)
+    valid = rows >= 0
+    shifted[valid] = matrix[rows[valid]]
+    return shifted
+
+
+def _pct_change(matrix, lagged):
+    return (matrix / lagged - 1.0) * 100.0
+
+
+def _dated_change(matrix, change, per_year, dates):
+    months = _CHANGE_MONTHS[change]
+    if dates is None or not np.any(np.asarray(dates) != UNKNOWN):
+        # No usable dates: fall back to counting rows
+        return _pct_change(matrix, _lagged(matrix, max(1, per_year * months // 12)))
+    rows = _lag_rows(dates, months, _LAG_TOLERANCE_DAYS.get(per_year, 0))
+    return _pct_change(matrix, _lagged_rows(matrix, rows))
+
+
+def transform_matrix(matrix, change: str, per_year: int = 1, window: int = None, dates=None):
+    """Apply ``change`` to a float matrix with one column per series.
+
+    ``dates`` are the rows' day ordinals, used to find the earlier period of
+    yoy and qoq; without them those lags are counted in rows.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if change == "qoq" and per_year < 4:
+        raise ValueError("qoq needs quarterly or more frequent data")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if change == "level":
+            result = matrix.copy()
+        elif change in _CHANGE_MONTHS:
+            result = _dated_change(matrix, change, per_year, dates)
+        elif change == "pop":
+            result = _pct_change(matrix, _lagged(matrix, 1))
+        elif change == "diff":
+            result = matrix - _lagged(matrix, 1)
+        elif change == "logdiff":
+            result = np.log(matrix / _lagged(matrix, 1)) * 100.0
+        elif change == "annualized":
+            result = (np.power(matrix / _lagged(matrix, 1), per_year) - 1.0) * 100.0
+        elif change == "rebase":
+            valid = ~np.isnan(matrix)
+            first = valid.argmax(axis=0)
+            base = matrix[first, np.arange(matrix.shape[1])]
+            base[~valid.any(axis=0)] = np.nan
+            result = matrix / base * 100.0
+        elif change == "rolling":
+            window = max(1, window or per_year)
+            result = pd.DataFrame(matrix).rolling(window, min_periods=window).mean().to_numpy()
+        else:
+            raise ValueError(f"Unknown change {change!r}; expected one of {', '.join(TRANSFORMS)}")
+    return np.where(np.isinf(result), np.nan, result)
+
+
+def transform(df: pd.DataFrame, change: str, freq: str = None, window: int = None) -> pd.DataFrame:
+    """Transformed copy of ``df``; a ``date`` column, if any, is left as is.
+
+    ``window`` is the rolling-mean length in periods (default one year).
+    Rows are dated by the ``date`` column, else by the index.
+    """
+    validate_change(change, freq)
+    columns = [col for col in df.columns if col != "date"]
+    result = df.copy()
+    if not columns or change == "level" or not len(df):
+        return result
+    labels = df["date"] if "date" in df.columns else df.index
+    per_year = periods_per_year(freq, labels)
+    dates = period_ordinals(labels.to_numpy()) if change in _CHANGE_MONTHS else None
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    result[columns] = transform_matrix(values, change, per_year, window, dates)
+    return result
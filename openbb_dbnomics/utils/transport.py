@@ -0,0 +1,156 @@
+"""Pooled, retrying HTTP transport shared by DBNomicsClient."""
+
+import random
+import threading
+import time
+from contextlib import ExitStack
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from openbb_dbnomics.utils.ratelimit import RateLimiter
+
+# Statuses worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HTTPTransport:
+    """Keep-alive session with timeouts and jittered exponential backoff.
+
+    One transport is meant to be shared by every call a client makes, so the
+    TLS handshake to api.db.nomics.world is paid once per pooled connection
+    instead of once per request.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 30.0,
+        session: requests.Session = None,
+        limiter: RateLimiter = None,
+    ):
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0,  # retries are handled here so Retry-After is honored
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        # Shared budget for all upstream calls; None means unlimited
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "failures": 0}
+
+    def get(self, url, params=None, headers=None, stream=False, queue_timeout=None):
+        """GET ``url``, retrying connection errors, timeouts, 429 and 5xx.
+
+        With a limiter, each attempt first waits (up to ``queue_timeout``
+        seconds, else the limiter's default) for an upstream slot. A
+        streamed response keeps its slot until ``response.close()``, since
+        the body is still being downloaded after this returns.
+        """
+        attempt = 0
+        while True:
+            self._count("requests")
+            try:
+                response = self._send(url, params, headers, stream, queue_timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                response.close()
+            attempt += 1
+            self._count("retries")
+            time.sleep(delay)
+
+    def _send(self, url, params, headers, stream, queue_timeout):
+        if self.limiter is None:
+            return self.session.get(
+                url, params=params, headers=headers, timeout=self.timeout, stream=stream
+            )
+        with ExitStack() as stack:
+            stack.enter_context(self.limiter.slot(queue_timeout))
+            response = self.session.get(
+                url, params=params, headers=headers, timeout=self.timeout, stream=stream
+            )
+            if stream:
+                _release_on_close(response, stack.pop_all())
+            return response
+
+    def stats(self):
+        """Request/retry counters plus connection pool reuse."""
+        with self._lock:
+            stats = dict(self._counters)
+        connections = 0
+        pooled_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            manager = getattr(adapter, "poolmanager", None)
+            if manager is None:
+                continue
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None:
+                    continue
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        stats["connections_opened"] = connections
+        stats["connections_reused"] = max(0, pooled_requests - connections)
+        if self.limiter is not None:
+            stats["limiter"] = self.limiter.stats()
+        return stats
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def _backoff(self, attempt):
+        # "Full jitter": spreads retries from concurrent callers apart
+        ceiling = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_max, max(0.0, delay))
+
+
+def _release_on_close(response, slot):
+    """Make ``response.close()`` also release ``slot`` (an ExitStack), once."""
+    close = response.close
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            slot.close()
+
+    response.close = close_and_release
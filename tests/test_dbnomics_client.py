@@ -1,9 +1,36 @@
 """Unit tests for DBNomicsClient."""
 
+import asyncio
+import json
+import os
+import threading
+import time
 import pytest
+import numpy as np
 import pandas as pd
+import requests
 from unittest.mock import Mock, patch
 from openbb_dbnomics.utils.providers import DBNomicsClient
+from openbb_dbnomics.utils.alignment import align_series, to_float_array
+from openbb_dbnomics.utils.cache import TTLCache, decoded_size
+from openbb_dbnomics.utils.decoding import JSONDecoder
+from openbb_dbnomics.utils.disk_cache import DiskCache
+from openbb_dbnomics.utils.facets import FacetIndex
+from openbb_dbnomics.utils.formats import encode_frame, to_arrow_ipc, to_columns, to_parquet
+from openbb_dbnomics.utils.downsample import downsample_indices, lttb_indices, minmax_indices
+from openbb_dbnomics.utils.listing import SeriesListing
+from openbb_dbnomics.utils.ndjson import iter_ndjson
+from openbb_dbnomics.utils.periods import (
+    UNKNOWN, period_bounds, period_frequency, period_ordinal, period_ordinals,
+)
+from openbb_dbnomics.utils.ratelimit import RateLimiter, RateLimitTimeout
+from openbb_dbnomics.utils.search_index import SearchIndex
+from openbb_dbnomics.utils.resilience import CircuitBreaker, CircuitOpenError
+from openbb_dbnomics.utils.series_store import SeriesStore
+from openbb_dbnomics.utils.singleflight import SingleFlight
+from openbb_dbnomics.utils.streaming import iter_json_items
+from openbb_dbnomics.utils.transforms import transform, transform_matrix
+from openbb_dbnomics.utils.transport import HTTPTransport
 
 
 class TestDBNomicsClient:
@@ -24,12 +51,12 @@ class TestDBNomicsClient:
         """Test successful providers fetch."""
         # Mock response
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "providers": [
                 {"code": "IMF", "name": "International Monetary Fund"},
                 {"code": "WB", "name": "World Bank"}
             ]
-        }
+        }).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -54,12 +81,12 @@ class TestDBNomicsClient:
     def test_get_datasets_success(self, mock_get):
         """Test successful datasets fetch."""
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "datasets": [
                 {"code": "IFS", "name": "International Financial Statistics"},
                 {"code": "WEO", "name": "World Economic Outlook"}
             ]
-        }
+        }).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -73,7 +100,7 @@ class TestDBNomicsClient:
     def test_get_series_success(self, mock_get):
         """Test successful series fetch."""
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "series": [
                 {
                     "id": "IMF/IFS/Q.US.NGDP_D_SA_IX",
@@ -82,7 +109,7 @@ class TestDBNomicsClient:
                     "INDICATOR": "NGDP_D_SA_IX"
                 }
             ]
-        }
+        }).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -96,14 +123,14 @@ class TestDBNomicsClient:
     def test_get_series_data_success(self, mock_get):
         """Test successful series data fetch."""
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "series": {
                 "values": [
                     {"period": "2020-Q1", "value": 100.0},
                     {"period": "2020-Q2", "value": 101.5}
                 ]
             }
-        }
+        }).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -117,12 +144,12 @@ class TestDBNomicsClient:
     def test_get_dataset_metadata_success(self, mock_get):
         """Test successful dataset metadata fetch."""
         mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "dimensions_values_labels": {
                 "REF_AREA": {"US": "United States", "EU": "European Union"},
                 "INDICATOR": {"NGDP_D_SA_IX": "GDP Index", "NGDP_SA_XDC": "GDP USD"}
             }
-        }
+        }).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
@@ -132,6 +159,18 @@ class TestDBNomicsClient:
         assert "INDICATOR" in metadata["dimensions_values_labels"]
         assert metadata["dimensions_values_labels"]["REF_AREA"]["US"] == "United States"
 
+    def test_series_query_params_dimension_filter(self):
+        """Test that dimension filters are encoded as the DBnomics JSON filter."""
+        params = DBNomicsClient.series_query_params(
+            limit=50, offset=100, ref_area="US", dimensions={"FREQ": "Q"}, q="gdp"
+        )
+        assert params == {
+            "limit": 50,
+            "offset": 100,
+            "dimensions": '{"FREQ":["Q"],"REF_AREA":["US"]}',
+            "q": "gdp",
+        }
+
     def test_construct_series_id(self):
         """Test series ID construction."""
         series_id = self.client.construct_series_id("IMF", "IFS", "Q", "US", "NGDP_D_SA_IX")
@@ -190,4 +229,1244 @@ class TestDBNomicsClient:
         # Test with 'period_start_day' field
         data_with_start_day = [{"period_start_day": "2020-01-01", "value": 100.0}]
         result = self.client._extract_values_and_periods(data_with_start_day)
-        assert result["periods"] == ["2020-01-01"] 
\ No newline at end of file
+        assert result["periods"] == ["2020-01-01"] 
+
+
+class TestHTTPTransport:
+    """Test cases for the pooled, retrying HTTP transport."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.transport = HTTPTransport(max_retries=2, backoff_factor=0.01)
+
+    def _response(self, status_code, headers=None):
+        response = Mock()
+        response.status_code = status_code
+        response.headers = headers or {}
+        return response
+
+    def test_client_shares_transport_session(self):
+        """Test that the client exposes the transport's pooled session."""
+        client = DBNomicsClient(transport=self.transport)
+        assert client.session is self.transport.session
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_retries_on_5xx_then_succeeds(self, mock_get, mock_sleep):
+        """Test that 5xx responses are retried with backoff."""
+        mock_get.side_effect = [self._response(503), self._response(200)]
+
+        response = self.transport.get("https://example.org")
+
+        assert response.status_code == 200
+        assert mock_get.call_count == 2
+        assert mock_get.call_args.kwargs["timeout"] == self.transport.timeout
+        assert self.transport.stats()["retries"] == 1
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_honors_retry_after(self, mock_get, mock_sleep):
+        """Test that a Retry-After header sets the retry delay."""
+        mock_get.side_effect = [self._response(429, {"Retry-After": "2"}), self._response(200)]
+
+        self.transport.get("https://example.org")
+
+        mock_sleep.assert_called_once_with(2.0)
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_gives_up_after_max_retries(self, mock_get, mock_sleep):
+        """Test that the last retryable response is returned once retries run out."""
+        mock_get.return_value = self._response(502)
+
+        response = self.transport.get("https://example.org")
+
+        assert response.status_code == 502
+        assert mock_get.call_count == 3
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_connection_error_raises_after_retries(self, mock_get, mock_sleep):
+        """Test that connection errors propagate after the retry budget."""
+        mock_get.side_effect = requests.ConnectionError("boom")
+
+        with pytest.raises(requests.ConnectionError):
+            self.transport.get("https://example.org")
+        assert self.transport.stats()["failures"] == 1
+
+
+class TestConcurrentFetch:
+    """Test cases for concurrent multi-indicator fetching."""
+
+    def test_results_keep_indicator_order(self):
+        """Test that parallel fetches are merged in the caller's indicator order."""
+        import time
+        client = DBNomicsClient(max_concurrency=4, batch_size=1)
+        delays = {"A": 0.05, "B": 0.0, "C": 0.02}
+
+        def fake_fetch(provider, dataset, series_id, observations=True, revalidate=False):
+            ind = series_id.split(".")[-1]
+            time.sleep(delays[ind])
+            return {"period": ["2020-Q1", "2020-Q2"], "value": [1.0, 2.0]}
+
+        with patch.object(client, '_fetch_series_doc', side_effect=fake_fetch) as mock_fetch:
+            result = client.get_multi_series_aligned("IMF", "IFS", "Q", "US", ["A", "B", "C"])
+
+        assert mock_fetch.call_count == 3
+        assert list(result[0].keys()) == ["date", "A", "B", "C"]
+
+    def test_map_concurrent_caps_workers(self):
+        """Test that the shared pool respects max_concurrency."""
+        client = DBNomicsClient(max_concurrency=2)
+        assert client._map_concurrent(lambda x: x * 2, [1, 2, 3]) == [2, 4, 6]
+        assert client._executor._max_workers == 2
+
+
+class TestBatchFetch:
+    """Test cases for series_ids batch fetching."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.client = DBNomicsClient(batch_size=2)
+
+    def _doc(self, code, values):
+        return {"series_code": code, "period": ["2020-Q1", "2020-Q2"], "value": values}
+
+    def test_batches_are_chunked_and_parsed_per_series(self):
+        """Test that indicators are grouped into series_ids requests."""
+        def fake_get(url, params=None, headers=None):
+            codes = [sid.split("/")[-1] for sid in params["series_ids"].split(",")]
+            response = Mock()
+            response.status_code = 200
+            response.raise_for_status.return_value = None
+            response.content = json.dumps({
+                "series": {"docs": [self._doc(code, [1.0, 2.0]) for code in codes]}
+            }).encode()
+            return response
+
+        with patch.object(self.client, '_get', side_effect=fake_get) as mock_get:
+            result = self.client.get_multi_series_aligned("IMF", "IFS", "Q", "US", ["A", "B", "C"])
+
+        assert mock_get.call_count == 2
+        assert all(call.args[0].endswith("/series") for call in mock_get.call_args_list)
+        assert list(result[0].keys()) == ["date", "A", "B", "C"]
+
+    def test_failed_batch_falls_back_to_single_series(self):
+        """Test that a failing batch request is retried per series."""
+        with patch.object(self.client, '_fetch_series_docs_batch',
+                          side_effect=requests.HTTPError("414")), \
+             patch.object(self.client, '_fetch_series_doc',
+                          return_value={"period": ["2020-Q1"], "value": [1.0]}) as mock_single:
+            result = self.client.get_multi_series_aligned("IMF", "IFS", "Q", "US", ["A", "B"])
+
+        assert mock_single.call_count == 2
+        assert result == [{"date": "2020-Q1", "A": 1.0, "B": 1.0}]
+
+
+class TestSeriesIterator:
+    """Test cases for the paginated series iterator."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.client = DBNomicsClient()
+        self.total = 5
+
+    def _fake_get(self, url, params=None, headers=None):
+        offset = params.get("offset", 0)
+        count = min(params["limit"], max(0, self.total - offset))
+        response = Mock()
+        response.status_code = 200
+        response.raise_for_status.return_value = None
+        response.content = json.dumps({"series": {
+            "num_found": self.total,
+            "docs": [{"series_code": f"S{i}", "dimensions": {"REF_AREA": "US"}}
+                     for i in range(offset, offset + count)],
+        }}).encode()
+        return response
+
+    def test_walks_all_pages(self):
+        """Test that pages are requested with advancing offsets until exhausted."""
+        with patch.object(self.client, '_get', side_effect=self._fake_get) as mock_get:
+            codes = [s["series_code"] for s in self.client.iter_series("IMF", "IFS", page_size=2)]
+
+        assert codes == ["S0", "S1", "S2", "S3", "S4"]
+        assert [c.kwargs["params"].get("offset", 0) for c in mock_get.call_args_list] == [0, 2, 4]
+
+    def test_limit_stops_without_extra_request(self):
+        """Test that a capped walk does not prefetch pages it will not yield."""
+        with patch.object(self.client, '_get', side_effect=self._fake_get) as mock_get:
+            page = list(self.client.iter_series("IMF", "IFS", page_size=2, offset=2, limit=2))
+
+        assert [s["series_code"] for s in page] == ["S2", "S3"]
+        assert mock_get.call_count == 1
+        assert page[0]["REF_AREA"] == "US"
+
+
+class TestStreamingParse:
+    """Test cases for incremental parsing of series listings."""
+
+    DOCS = [
+        {"series_code": "A.US.X", "series_name": "Ünïcode", "dimensions": {"REF_AREA": "US"}},
+        {"series_code": "A.FR.X", "series_name": "France", "dimensions": {"REF_AREA": "FR"}},
+    ]
+
+    def _body(self):
+        payload = {"_meta": {"docs": "ignored"}, "series": {"docs": self.DOCS, "num_found": 2}}
+        return json.dumps(payload, ensure_ascii=False).encode()
+
+    def test_items_parsed_across_chunk_boundaries(self):
+        """Test that docs are recovered whatever the chunk size."""
+        body = self._body()
+        for size in (1, 5, 64, len(body)):
+            chunks = [body[i:i + size] for i in range(0, len(body), size)]
+            assert list(iter_json_items(chunks, ("series", "docs"))) == self.DOCS
+
+    def test_each_value_decoded_once(self):
+        """Test that a value spanning many chunks is decoded once it is complete."""
+        docs = [{"name": 'a"]}\\', "values": list(range(50))}, -1.5, "tail"]
+        body = json.dumps({"series": {"docs": docs}}).encode()
+        raw_decode = json.JSONDecoder.raw_decode
+        calls = []
+
+        def counting(decoder, text, idx=0):
+            calls.append(idx)
+            return raw_decode(decoder, text, idx)
+
+        with patch.object(json.JSONDecoder, 'raw_decode', counting):
+            items = list(iter_json_items([body[i:i + 1] for i in range(len(body))], ("series", "docs")))
+
+        assert items == docs
+        assert len(calls) == 2 + len(docs)  # two keys, then the items
+
+    def test_large_listing_streamed_and_filtered(self):
+        """Test that large listings are streamed with filters applied while parsing."""
+        client = DBNomicsClient(stream_threshold=10)
+        response = Mock()
+        response.status_code = 200
+        response.iter_content.return_value = iter([self._body()])
+
+        with patch('openbb_dbnomics.utils.streaming.ijson', None), \
+                patch.object(client, '_get', return_value=response) as mock_get:
+            series = client.get_series("IMF", "IFS", limit=10, dimensions={"REF_AREA": ["FR"]})
+
+        assert [s["series_code"] for s in series] == ["A.FR.X"]
+        assert mock_get.call_args.kwargs["stream"] is True
+        response.close.assert_called_once()
+
+    def test_dataset_search_streamed(self):
+        """Test that dataset search results are yielded from a streamed response."""
+        client = DBNomicsClient()
+        response = Mock()
+        response.status_code = 200
+        body = json.dumps({"results": {"docs": [{"code": "IFS"}, {"code": "WEO"}]}}).encode()
+        response.iter_content.return_value = iter([body])
+
+        with patch('openbb_dbnomics.utils.streaming.ijson', None), \
+                patch.object(client, '_get', return_value=response):
+            datasets = list(client.iter_datasets("gdp"))
+
+        assert datasets == [{"code": "IFS"}, {"code": "WEO"}]
+        assert list(client.iter_datasets("")) == []
+
+    def test_ndjson_lines(self):
+        """Test that NDJSON output has one document per line, first line flushed alone."""
+        chunks = list(iter_ndjson(({"n": i} for i in range(100)), batch_bytes=64))
+
+        assert chunks[0] == b'{"n":0}\n'
+        assert b"".join(chunks).decode().splitlines() == [json.dumps({"n": i}).replace(" ", "") for i in range(100)]
+        assert 2 < len(chunks) < 100
+
+
+class TestSearchIndex:
+    """Test cases for the local full-text search index."""
+
+    def setup_method(self):
+        self.index = SearchIndex({"code": 3.0, "name": 1.0}, key=lambda doc: doc["code"])
+        self.index.add_many([
+            {"code": "CPI", "name": "Consumer price index"},
+            {"code": "IFS", "name": "International Financial Statistics"},
+            {"code": "INFL", "name": "Inflation expectations"},
+            {"code": "WEO", "name": "World Economic Outlook, inflation and GDP"},
+        ])
+
+    def test_ranked_prefix_and_term_queries(self):
+        """Test that every term must match, as a token or a prefix, best first."""
+        assert [doc["code"] for doc in self.index.search("infl")] == ["INFL", "WEO"]
+        assert [doc["code"] for doc in self.index.search("inflation gdp")] == ["WEO"]
+        assert [doc["code"] for doc in self.index.search("cons PRICE")] == ["CPI"]
+        assert self.index.search("inflation zzz") == []
+        assert self.index.search("   ") == []
+
+    def test_replaces_documents_by_key(self):
+        """Test that re-adding a document replaces its tokens."""
+        self.index.add({"code": "CPI", "name": "Harmonised prices"})
+
+        assert len(self.index) == 4
+        assert self.index.search("consumer") == []
+        assert self.index.search("harmonised")[0]["code"] == "CPI"
+
+    def test_datasets_answered_locally_when_complete(self):
+        """Test that a warm dataset index answers searches without DBnomics."""
+        client = DBNomicsClient()
+        pages = {
+            "/providers": {"providers": {"docs": [{"code": "IMF", "name": "International Monetary Fund"}]}},
+            "/datasets/IMF": {"datasets": {"num_found": 2, "docs": [
+                {"code": "IFS", "name": "International Financial Statistics"},
+                {"code": "WEO", "name": "World Economic Outlook"},
+            ]}},
+        }
+
+        def fake_get_json(url, params=None, kind=None, raise_errors=False):
+            return pages[url[len(client.base_url):]]
+
+        with patch.object(client, '_get_json', side_effect=fake_get_json):
+            client.warm_dataset_index()
+        with patch.object(client, '_get_json') as mock_get_json:
+            datasets = client.get_datasets(search_term="world outl")
+
+        assert client.dataset_index.fresh
+        assert [(doc["provider_code"], doc["code"]) for doc in datasets] == [("IMF", "WEO")]
+        mock_get_json.assert_not_called()
+
+    def test_series_search_after_full_listing(self):
+        """Test that a dataset's whole listing is indexed and then searched locally."""
+        client = DBNomicsClient()
+        docs = [
+            {"series_code": "Q.US.GDP", "series_name": "US gross domestic product", "dimensions": {"REF_AREA": "US"}},
+            {"series_code": "Q.FR.GDP", "series_name": "France gross domestic product", "dimensions": {"REF_AREA": "FR"}},
+            {"series_code": "Q.US.CPI", "series_name": "US consumer prices", "dimensions": {"REF_AREA": "US"}},
+        ]
+        with patch.object(client, '_get_json', return_value={"series": {"docs": docs}}):
+            client.get_series("IMF", "IFS", limit=100)
+        with patch.object(client, '_get_json') as mock_get_json:
+            series = client.get_series("IMF", "IFS", q="gross dom", ref_area="US")
+
+        assert [s["series_code"] for s in series] == ["Q.US.GDP"]
+        mock_get_json.assert_not_called()
+        assert client.series_index("IMF", "WEO") is None
+
+    def test_capped_listing_not_indexed(self):
+        """Test that a listing cut short by the page cap or num_found is not taken as whole."""
+        client = DBNomicsClient()
+        docs = [{"series_code": f"S{i}", "dimensions": {}} for i in range(DBNomicsClient.SERIES_PAGE_MAX)]
+        with patch.object(client, '_stream_docs', return_value=iter(docs)):
+            client.get_series("IMF", "IFS", limit=DBNomicsClient.SERIES_PAGE_MAX)
+        with patch.object(client, '_get_json', return_value={"series": {"docs": docs[:3], "num_found": 9}}):
+            client.get_series("IMF", "WEO", limit=100)
+
+        assert client.series_index("IMF", "IFS") is None
+        assert client.series_index("IMF", "WEO") is None
+
+    def test_too_large_dataset_not_walked_again(self):
+        """Test that num_found stops the warm-up of a huge dataset and the answer is remembered."""
+        client = DBNomicsClient(search_warmup=True)
+        page = {"series": {"docs": [{"series_code": "A"}], "num_found": 1_000_000}}
+        with patch.object(client, '_get_json', return_value=page) as mock_get_json:
+            assert client.warm_series_index("IMF", "IFS") is False
+        with patch.object(client, '_get_json', return_value=page), \
+                patch.object(client, '_warm_in_background') as mock_warm:
+            client.get_series("IMF", "IFS", q="gdp")
+
+        assert mock_get_json.call_count == 1
+        mock_warm.assert_not_called()
+        assert client.series_index("IMF", "IFS") is None
+
+    def test_limit_above_page_cap_is_paged(self):
+        """Test that a limit above DBnomics' page cap is fetched page by page, not cut to one page."""
+        client = DBNomicsClient()
+
+        def fake_get_json(url, params=None, **kwargs):
+            start, count = params.get("offset", 0), params["limit"]
+            docs = [{"series_code": f"S{i}"} for i in range(start, min(start + count, 2500))]
+            return {"series": {"docs": docs, "num_found": 2500}}
+
+        with patch.object(client, '_get_json', side_effect=fake_get_json) as mock_get_json:
+            series = client.get_series("IMF", "IFS", limit=3000)
+
+        assert len(series) == 2500 and series[-1]["series_code"] == "S2499"
+        assert [c.kwargs["params"]["limit"] for c in mock_get_json.call_args_list] == [1000] * 3
+        assert client.series_index("IMF", "IFS") is not None
+
+    def test_indexes_expire_with_their_data(self):
+        """Test that expired indexes are dropped and searches go upstream again."""
+        client = DBNomicsClient(cache_ttls={"series": 0, "metadata": 0})
+        client._index_series("IMF", "IFS", [{"series_code": "A", "series_name": "GDP"}])
+        index = client._new_dataset_index()
+        index.add({"provider_code": "IMF", "code": "IFS", "name": "Financial statistics"})
+        index.mark_complete(ttl=0)
+        client.dataset_index = index
+
+        with patch.object(client, '_get_json', return_value={"results": {"docs": [{"code": "NEW"}]}}) as mock_get_json:
+            datasets = client.get_datasets("financial")
+
+        assert client.series_index("IMF", "IFS") is None
+        assert datasets == [{"code": "NEW"}]
+        mock_get_json.assert_called_once()
+
+    def test_failed_warmup_is_logged(self, caplog):
+        """Test that a failing background warm-up is logged, not swallowed."""
+        client = DBNomicsClient()
+        done = threading.Event()
+
+        def fail():
+            try:
+                raise requests.ConnectionError("down")
+            finally:
+                done.set()
+
+        with caplog.at_level("WARNING", logger="openbb_dbnomics.utils.providers"):
+            client._warm_in_background("datasets", fail)
+            done.wait(5)
+            for _ in range(100):
+                if "datasets" not in client._warming:
+                    break
+                time.sleep(0.01)
+
+        assert "warm-up 'datasets' failed" in caplog.text
+
+
+class TestSeriesListing:
+    """Test cases for the columnar series listing."""
+
+    RECORDS = [
+        {"series_code": "Q.US.GDP", "series_name": "US gross domestic product", "dataset_code": "IFS",
+         "dataset_name": "IFS", "provider_code": "IMF", "FREQ": "Q", "REF_AREA": "US"},
+        {"series_code": "Q.FR.GDP", "series_name": "France GDP", "dataset_code": "IFS",
+         "dataset_name": "IFS", "provider_code": "IMF", "FREQ": "Q", "REF_AREA": "FR"},
+        {"series_code": "Q.US.CPI", "series_name": "US consumer prices", "dataset_code": "IFS",
+         "dataset_name": None, "provider_code": "IMF", "FREQ": "Q", "REF_AREA": "US", "UNIT": "IX"},
+    ]
+
+    def test_round_trip_and_interning(self):
+        """Test that records survive encoding and repeated values are stored once."""
+        listing = SeriesListing.from_records(iter(self.RECORDS))
+
+        assert len(listing) == 3
+        assert listing.to_records() == self.RECORDS
+        assert list(listing.columns["REF_AREA"].categories) == ["US", "FR"]
+        assert listing.columns["UNIT"].codes.tolist() == [-1, -1, 0]
+
+    def test_vectorized_filters(self):
+        """Test REF_AREA, dimension and name filters as masks."""
+        listing = SeriesListing.from_records(self.RECORDS)
+
+        assert listing.mask(ref_area="US").tolist() == [True, False, True]
+        assert listing.mask(dimensions={"REF_AREA": ["FR", "XX"]}).tolist() == [False, True, False]
+        assert listing.mask(dimensions={"UNIT": "IX"}).tolist() == [True, True, True]
+        us_gdp = listing.filter(ref_area="US", name_filter="gdp")
+        assert us_gdp.to_records() == []
+        assert [r["series_code"] for r in listing.filter(name_filter="US ").to_records()] == [
+            "Q.US.GDP", "Q.US.CPI",
+        ]
+
+    def test_lazy_slice(self):
+        """Test that slicing returns only the requested rows."""
+        listing = SeriesListing.from_records(self.RECORDS)
+
+        assert listing.to_records(1, 2) == self.RECORDS[1:2]
+        assert listing[2:].to_records() == self.RECORDS[2:]
+
+
+class TestFacetIndex:
+    """Test cases for faceted filtering over dimension value codes."""
+
+    RECORDS = [
+        {"series_code": "Q.US.GDP", "REF_AREA": "US", "INDICATOR": "GDP", "FREQ": "Q"},
+        {"series_code": "Q.US.CPI", "REF_AREA": "US", "INDICATOR": "CPI", "FREQ": "Q"},
+        {"series_code": "M.US.CPI", "REF_AREA": "US", "INDICATOR": "CPI", "FREQ": "M"},
+        {"series_code": "Q.FR.GDP", "REF_AREA": "FR", "INDICATOR": "GDP", "FREQ": "Q"},
+        {"series_code": "X.JP.GDP", "REF_AREA": "JP", "INDICATOR": "GDP"},
+    ]
+
+    def setup_method(self):
+        self.listing = SeriesListing.from_records(self.RECORDS)
+        self.index = FacetIndex(self.listing)
+
+    def test_and_across_dimensions_or_within(self):
+        """Test that selections match the listing's own filter mask."""
+        filters = [
+            ({"REF_AREA": ["US", "FR"], "INDICATOR": ["GDP"]}, ["Q.US.GDP", "Q.FR.GDP"]),
+            ({"FREQ": ["M"]}, ["M.US.CPI", "X.JP.GDP"]),
+            ({"REF_AREA": ["DE"]}, []),
+            ({"UNKNOWN": ["X"]}, [s["series_code"] for s in self.RECORDS]),
+        ]
+        for dimensions, expected in filters:
+            positions, _ = self.index.query(dimensions=dimensions)
+            assert self.listing.take(positions).to_records() == self.listing.filter(dimensions=dimensions).to_records()
+            assert [self.RECORDS[i]["series_code"] for i in positions] == expected
+
+    def test_disjunctive_counts(self):
+        """Test that each dimension's counts ignore its own selection."""
+        positions, counts = self.index.query(ref_area="US", dimensions={"INDICATOR": ["CPI"]})
+
+        assert len(positions) == 2
+        assert counts["REF_AREA"] == {"US": 2}
+        assert counts["INDICATOR"] == {"GDP": 1, "CPI": 2}
+        assert counts["FREQ"] == {"Q": 1, "M": 1}
+
+    def test_client_builds_index_once(self):
+        """Test that facet queries reuse one walk of the dataset listing."""
+        client = DBNomicsClient()
+        docs = [{"series_code": r["series_code"], "dimensions": {k: v for k, v in r.items() if k != "series_code"}}
+                for r in self.RECORDS]
+        with patch.object(client, '_get_json', return_value={"series": {"docs": docs, "num_found": 5}}) as mock_get_json:
+            first = client.get_facet_index("IMF", "IFS")
+            second = client.get_facet_index("IMF", "IFS")
+
+        assert first is second and first.size == 5
+        assert mock_get_json.call_count == 1
+        assert client.series_index("IMF", "IFS") is not None
+
+    def test_too_large_dataset_not_walked(self):
+        """Test that num_found stops the walk of a too-large dataset, and the answer is cached."""
+        client = DBNomicsClient()
+        page = {"series": {"docs": [{"series_code": "A"}], "num_found": client.FACET_INDEX_MAX_SERIES + 1}}
+        with patch.object(client, '_get_json', return_value=page) as mock_get_json:
+            assert client.get_facet_index("IMF", "IFS") is None
+            assert client.get_facet_index("IMF", "IFS") is None
+
+        assert mock_get_json.call_count == 1
+
+
+class TestAlignment:
+    """Test cases for single-pass series alignment."""
+
+    SERIES = {
+        "A": (["2020-Q2", "2020-Q1"], [2.0, 1.0]),
+        "B": (["2020-Q2", "2020-Q3"], ["NA", 3.5]),
+        "C": None,
+    }
+
+    def test_outer_alignment_records(self):
+        """Test that periods are unioned, sorted and NA becomes NaN."""
+        records = align_series(self.SERIES).to_records()
+
+        assert [r["date"] for r in records] == ["2020-Q1", "2020-Q2", "2020-Q3"]
+        assert records[0]["A"] == 1.0 and pd.isna(records[0]["B"])
+        assert pd.isna(records[1]["B"])
+        assert records[2]["B"] == 3.5 and "C" not in records[2]
+
+    def test_frame_and_columns_outputs(self):
+        """Test the DataFrame and columnar outputs."""
+        aligned = align_series(self.SERIES)
+
+        frame = aligned.to_frame()
+        assert list(frame.columns) == ["A", "B"]
+        assert frame.index.name == "date"
+        assert aligned.to_columns() == {
+            "date": ["2020-Q1", "2020-Q2", "2020-Q3"],
+            "A": [1.0, 2.0, None],
+            "B": [None, None, 3.5],
+        }
+
+
+class TestPeriods:
+    """Test cases for DBnomics period parsing."""
+
+    def test_period_start_days(self):
+        """Test that each frequency maps to the ordinal of its first day."""
+        jan1 = period_ordinal("2020-01-01")
+        assert period_ordinal("2020") == jan1
+        assert period_ordinal("2020-S1") == jan1
+        assert period_ordinal("2020-Q1") == jan1
+        assert period_ordinal("2020-01") == jan1
+        assert period_ordinal("2020-Q3") == period_ordinal("2020-07-01")
+        assert period_ordinal("2020-S2") == period_ordinal("2020-07")
+        assert period_ordinal("2020-W01") == period_ordinal("2019-12-30")
+        assert period_ordinal("1970-01-01") == 0
+
+    def test_vectorized_matches_scalar(self):
+        """Test that the vectorized parser agrees with the scalar one."""
+        labels = ["2020-03-15", "2020-03", "2020", "2020-Q2", "2020-W10", "bogus", "2020-13"]
+        ordinals = period_ordinals(labels)
+
+        assert ordinals[:5].tolist() == [period_ordinal(label) for label in labels[:5]]
+        assert ordinals[5] == UNKNOWN and ordinals[6] == UNKNOWN
+
+    def test_frequency(self):
+        """Test frequency detection from the label format."""
+        assert [period_frequency(p) for p in ("2020", "2020-S1", "2020-Q1", "2020-01", "2020-W01",
+                                              "2020-01-01", "x")] == ["A", "S", "Q", "M", "W", "D", None]
+
+    def test_alignment_orders_mixed_formats_chronologically(self):
+        """Test that alignment sorts by period start, not lexically."""
+        aligned = align_series({"A": (["2020-05", "2020-Q2", "2019-W52"], [1.0, 2.0, 3.0])})
+
+        assert aligned.periods.tolist() == ["2019-W52", "2020-Q2", "2020-05"]
+        assert aligned.ordinals.tolist() == sorted(aligned.ordinals.tolist())
+
+    def test_period_bounds(self):
+        """Test first and last days of a period."""
+        assert period_bounds("2020-Q4") == (period_ordinal("2020-10-01"), period_ordinal("2020-12-31"))
+        assert period_bounds("2020-02") == (period_ordinal("2020-02-01"), period_ordinal("2020-02-29"))
+        assert period_bounds("2020-03-15") == (period_ordinal("2020-03-15"),) * 2
+
+    def test_date_window_pushed_into_alignment(self):
+        """Test that periods outside the window are dropped before alignment."""
+        days = [f"2020-01-{d:02d}" for d in range(1, 32)]
+        series = {"A": (days, list(range(31))), "B": (["2019-12-31", "bogus"], [1.0, 2.0])}
+        first, last = period_ordinal("2020-01-10"), period_bounds("2020-01-12")[1]
+
+        aligned = align_series(series, first=first, last=last)
+        assert aligned.periods.tolist() == ["2020-01-10", "2020-01-11", "2020-01-12"]
+        assert aligned.values[:, 0].tolist() == [9.0, 10.0, 11.0]
+        assert align_series(series).between(first, last).periods.tolist() == aligned.periods.tolist()
+
+    def test_only_window_values_converted(self):
+        """Test that observations outside the window are never converted to floats."""
+        days = [f"2020-01-{d:02d}" for d in range(1, 32)]
+        series = {"A": (days, [str(d) for d in range(31)]), "B": (["2020-01-11", "2019-12-01"], ["NA", "1"])}
+        first, last = period_ordinal("2020-01-10"), period_bounds("2020-01-12")[1]
+        converted = []
+
+        def counting(values):
+            converted.append(list(values))
+            return to_float_array(values)
+
+        with patch('openbb_dbnomics.utils.alignment.to_float_array', side_effect=counting):
+            aligned = align_series(series, first=first, last=last)
+
+        assert converted == [["9", "10", "11"], ["NA"]]
+        assert aligned.values[:, 0].tolist() == [9.0, 10.0, 11.0]
+
+
+class TestTransforms:
+    """Test cases for the frequency-aware transformation engine."""
+
+    def _frame(self, index):
+        values = np.arange(1, len(index) + 1, dtype=float)
+        return pd.DataFrame({"A": values * 100, "B": values * 10}, index=index)
+
+    def test_yoy_lag_follows_frequency(self):
+        """Test that year-on-year uses one year of periods for each frequency."""
+        monthly = transform(self._frame([f"2020-{m:02d}" for m in range(1, 13)] + ["2021-01"]), "yoy", "M")
+        weekly = transform(self._frame([f"2020-W{w:02d}" for w in range(1, 53)] + ["2021-W01"]), "yoy", None)
+        annual = transform(self._frame(["2019", "2020"]), "yoy", "A")
+
+        assert monthly["A"].isna().sum() == 12 and monthly["A"].iloc[12] == pytest.approx(1200.0)
+        assert weekly["A"].isna().sum() == 52
+        assert annual["A"].iloc[1] == pytest.approx(100.0)
+
+    def test_yoy_and_qoq_lag_by_date(self):
+        """Test that a missing period gives NaN instead of a comparison with the wrong period."""
+        df = self._frame(["2020-Q1", "2020-Q2", "2020-Q4", "2021-Q1", "2021-Q2"])
+        yoy = transform(df, "yoy", "Q")
+        qoq = transform(df, "qoq", "Q")
+
+        assert yoy["A"].isna().tolist() == [True, True, True, False, False]
+        assert yoy["A"].iloc[3] == pytest.approx(300.0)
+        assert qoq["A"].isna().tolist() == [True, False, True, False, False]
+        assert qoq["A"].iloc[3] == pytest.approx(100 * 4 / 3 - 100)
+
+    def test_weekly_yoy_lags_52_weeks(self):
+        """Test that weekly yoy compares each week with the one 52 weeks back, across ISO years."""
+        days = pd.date_range("2014-12-28", periods=320, freq="W-SUN").strftime("%Y-%m-%d").tolist()
+        weeks = [f"{d.isocalendar()[0]}-W{d.isocalendar()[1]:02d}"
+                 for d in pd.date_range("2014-12-29", periods=320, freq="W-MON")]
+        for index in (days, weeks):
+            result = transform(self._frame(index), "yoy", "W")
+            expected = (np.arange(53, 321) / np.arange(1, 269) - 1.0) * 100.0
+
+            assert result["A"].iloc[:52].isna().all()
+            np.testing.assert_allclose(result["A"].iloc[52:].to_numpy(), expected)
+
+    def test_qoq_rejected_below_quarterly(self):
+        """Test that quarter-on-quarter changes of annual or semiannual data are refused."""
+        for freq, index in (("A", ["2019", "2020"]), ("S", ["2020-S1", "2020-S2"])):
+            with pytest.raises(ValueError):
+                transform(self._frame(index), "qoq", freq)
+
+    def test_matrix_transforms(self):
+        """Test diff, log-diff, annualized growth, rebasing and rolling means."""
+        matrix = np.array([[np.nan, 100.0], [100.0, 110.0], [121.0, 121.0]])
+
+        diff = transform_matrix(matrix, "diff")
+        assert np.isnan(diff[1, 0]) and diff[2, 0] == pytest.approx(21.0)
+        assert transform_matrix(matrix, "logdiff")[2, 1] == pytest.approx(100 * np.log(1.1))
+        assert transform_matrix(matrix, "annualized", per_year=4)[1, 1] == pytest.approx(46.41)
+        rebased = transform_matrix(matrix, "rebase")
+        assert rebased[1, 0] == pytest.approx(100.0) and rebased[2, 1] == pytest.approx(121.0)
+        rolling = transform_matrix(matrix, "rolling", window=2)
+        assert np.isnan(rolling[0, 1]) and rolling[1, 1] == pytest.approx(105.0)
+
+    def test_unknown_change(self):
+        """Test that an unknown transform is rejected."""
+        with pytest.raises(ValueError):
+            transform_matrix(np.ones((2, 1)), "median")
+
+
+class TestDownsample:
+    """Test cases for chart downsampling."""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.y = np.cumsum(rng.normal(size=20_000))
+        self.y[7_000] = 500.0
+        self.y[13_000] = -500.0
+
+    @pytest.mark.parametrize("method", ["minmax", "lttb"])
+    def test_bounded_and_keeps_extremes(self, method):
+        """Test that output fits max_points and keeps endpoints, peak and trough."""
+        keep = downsample_indices(self.y, 200, method)
+
+        assert len(keep) <= 200
+        assert np.all(np.diff(keep) > 0)
+        assert {0, 7_000, 13_000, 19_999} <= set(keep.tolist())
+
+    def test_minmax_keeps_every_bucket_extreme(self):
+        """Test that min/max buckets preserve the range of each bucket."""
+        keep = minmax_indices(self.y, 100)
+        edges = np.linspace(1, len(self.y) - 1, 50).astype(int)
+
+        for lo, hi in zip(edges[:-1], edges[1:]):
+            kept = self.y[keep[(keep >= lo) & (keep < hi)]]
+            assert kept.max() == self.y[lo:hi].max() and kept.min() == self.y[lo:hi].min()
+
+    def test_missing_values(self):
+        """Test that gaps stay visible in min/max and are skipped by LTTB."""
+        y = np.arange(1_000, dtype=float)
+        y[400:600] = np.nan
+
+        assert np.isnan(y[minmax_indices(y, 50)]).any()
+        assert not np.isnan(y[lttb_indices(y, 50)]).any()
+
+    def test_short_series_unchanged(self):
+        """Test that series already within max_points are kept whole."""
+        assert minmax_indices([1.0, 2.0, 3.0], 10).tolist() == [0, 1, 2]
+        with pytest.raises(ValueError):
+            downsample_indices(self.y, 100, "mean")
+
+
+class TestFormats:
+    """Test cases for columnar encodings of aligned frames."""
+
+    def setup_method(self):
+        self.frame = align_series({
+            "A": (["2020-Q1", "2020-Q2"], [1.0, "NA"]),
+            "B": (["2020-Q2", "2020-Q3"], [2.0, 3.0]),
+        }).to_frame()
+
+    def test_columns(self):
+        """Test column-oriented JSON with null for missing values."""
+        assert to_columns(self.frame) == {
+            "date": ["2020-Q1", "2020-Q2", "2020-Q3"],
+            "A": [1.0, None, None],
+            "B": [None, 2.0, 3.0],
+        }
+
+    def test_arrow_and_parquet_round_trip(self):
+        """Test that Arrow IPC and Parquet bytes decode to the same columns."""
+        pa = pytest.importorskip("pyarrow")
+        import io
+        import pyarrow.parquet as pq
+
+        expected = to_columns(self.frame)
+        assert pa.ipc.open_stream(to_arrow_ipc(self.frame)).read_all().to_pydict() == expected
+        assert pq.read_table(io.BytesIO(to_parquet(self.frame))).to_pydict() == expected
+
+    def test_unknown_format(self):
+        """Test that an unknown format is rejected."""
+        with pytest.raises(ValueError):
+            encode_frame(self.frame, "xml")
+
+
+class TestTTLCache:
+    """Test cases for the in-process TTL/LRU cache."""
+
+    def test_hit_miss_and_expiry(self):
+        """Test hit/miss accounting and per-entry expiry."""
+        cache = TTLCache()
+        cache.set("a", 1, ttl=60, size=10)
+        cache.set("b", 2, ttl=0, size=10)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["expirations"] == 1
+
+    def test_evicts_least_recently_used_by_size(self):
+        """Test that the byte budget evicts the least recently used entry."""
+        cache = TTLCache(max_bytes=25)
+        cache.set("a", 1, size=10)
+        cache.set("b", 2, size=10)
+        cache.get("a")
+        cache.set("c", 3, size=10)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == 20
+
+    def test_client_charges_decoded_size(self):
+        """Test that cached responses are charged their decoded size, not their payload bytes."""
+        client = DBNomicsClient()
+        response = Mock(status_code=200, content=b'{"datasets": {"docs": [{"code": "IFS"}]}}', headers={})
+
+        with patch.object(client, '_get', return_value=response):
+            client.get_dataset_metadata("IMF", "IFS")
+
+        assert client.cache.stats()["bytes"] == decoded_size(len(response.content))
+        assert decoded_size(len(response.content)) > len(response.content)
+
+    def test_metadata_is_fetched_once(self):
+        """Test that ref_areas and indicators share one metadata download."""
+        client = DBNomicsClient()
+        response = Mock()
+        response.status_code = 200
+        response.content = b'{"datasets": {"docs": [{"code": "IFS"}]}}'
+
+        with patch.object(client, '_get', return_value=response) as mock_get:
+            client.get_dataset_metadata("IMF", "IFS")
+            client.get_dataset_metadata("IMF", "IFS")
+            client.get_ref_area_map("IMF", "IFS")
+
+        assert mock_get.call_count == 1
+        assert client.stats()["cache"]["hits"] == 2
+
+
+class TestDiskCache:
+    """Test cases for the persistent response cache."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """Set up test fixtures."""
+        self.tmpdir = str(tmp_path)
+        self.disk = DiskCache(self.tmpdir, ttls={"metadata": 60})
+        self.client = DBNomicsClient(disk_cache=self.disk, cache_ttls={"metadata": 0})
+
+    def _response(self, status_code, body=b'{"datasets": {"docs": [{"code": "IFS"}]}}'):
+        response = Mock()
+        response.status_code = status_code
+        response.content = body
+        response.headers = {"ETag": '"v1"'}
+        response.json.side_effect = lambda: json.loads(body)
+        return response
+
+    def test_fresh_entry_served_without_request(self):
+        """Test that a stored, unexpired response skips the network."""
+        with patch.object(self.client, '_get', return_value=self._response(200)) as mock_get:
+            self.client.get_dataset_metadata("IMF", "IFS")
+            metadata = self.client.get_dataset_metadata("IMF", "IFS")
+
+        assert metadata == {"code": "IFS"}
+        assert mock_get.call_count == 1
+
+    def test_stale_entry_revalidated_with_etag(self):
+        """Test that a stale entry is revalidated and reused on 304."""
+        key = DiskCache.make_key(f"{self.client.base_url}/datasets/IMF/IFS")
+        self.disk.ttls["metadata"] = 0.001
+        self.disk.store(key, "metadata", b'{"datasets": [{"code": "IFS"}]}', etag='"v1"')
+        time.sleep(0.01)
+
+        with patch.object(self.client, '_get', return_value=self._response(304, b"")) as mock_get:
+            metadata = self.client.get_dataset_metadata("IMF", "IFS")
+
+        assert metadata == {"code": "IFS"}
+        assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+        assert self.disk.stats()["revalidated"] == 1
+
+    def test_old_entries_purged_on_open(self):
+        """Test that entries older than max_age are dropped when the cache is opened."""
+        self.disk.store("old", "metadata", b"{}")
+        self.disk.store("new", "metadata", b"{}")
+        self.disk._conn.execute("UPDATE responses SET stored_at = ? WHERE key = 'old'", (time.time() - 120,))
+        self.disk.close()
+
+        reopened = DiskCache(self.tmpdir, max_age=60)
+
+        assert reopened.lookup("old") is None
+        assert reopened.lookup("new") is not None
+        assert reopened.stats()["purged"] == 1
+
+
+class TestSeriesStore:
+    """Test cases for the local Parquet series store."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        """Set up test fixtures."""
+        pytest.importorskip("pyarrow")
+        self.store = SeriesStore(str(tmp_path), check_interval=0)
+        self.client = DBNomicsClient(series_store=self.store, batch_size=10)
+
+    def _doc(self, code, indexed_at, values=None):
+        doc = {"series_code": code, "indexed_at": indexed_at}
+        if values is not None:
+            doc.update({"period": ["2020-Q1", "2020-Q2"], "value": values})
+        return doc
+
+    def test_round_trip_maps_na_to_none(self):
+        """Test that stored observations read back with NA as missing."""
+        self.store.write("IMF", "IFS", "Q.US.A", ["2020-Q1", "2020-Q2"], [1.5, "NA"], "t1")
+
+        assert self.store.read("IMF", "IFS", "Q.US.A") == (["2020-Q1", "2020-Q2"], [1.5, None])
+        assert self.store.indexed_at("IMF", "IFS", "Q.US.A") == "t1"
+
+    def test_write_many_saves_manifest_once(self):
+        """Test that a batch of series updates the manifest in one save."""
+        series = [(f"Q.US.{i}", ["2020-Q1"], [float(i)], "t1") for i in range(5)]
+        with patch.object(self.store, '_save_manifest', wraps=self.store._save_manifest) as mock_save:
+            self.store.write_many("IMF", "IFS", series)
+
+        assert mock_save.call_count == 1
+        assert self.store.read("IMF", "IFS", "Q.US.3") == (["2020-Q1"], [3.0])
+        assert self.store.stats()["writes"] == 5
+
+    def test_concurrent_writes_do_not_collide(self):
+        """Test that writers of the same series each use their own temporary file."""
+        threads = [
+            threading.Thread(target=self.store.write,
+                             args=("IMF", "IFS", "Q.US.A", ["2020-Q1"], [float(i)], "t1"))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert self.store.read("IMF", "IFS", "Q.US.A")[1][0] in {float(i) for i in range(8)}
+        assert not [name for name in os.listdir(self.store._partition("IMF", "IFS")) if name.endswith(".tmp")]
+
+    def test_only_reindexed_series_are_downloaded(self):
+        """Test that refresh re-downloads only series whose indexed_at changed."""
+        self.store.write("IMF", "IFS", "Q.US.A", ["2020-Q1", "2020-Q2"], [1.0, 2.0], "t1")
+        self.store.write("IMF", "IFS", "Q.US.B", ["2020-Q1", "2020-Q2"], [3.0, 4.0], "t1")
+
+        def fake_docs(provider, dataset, codes, observations=True, revalidate=False):
+            assert revalidate
+            if not observations:
+                return {"Q.US.A": self._doc("Q.US.A", "t1"), "Q.US.B": self._doc("Q.US.B", "t2")}
+            return {code: self._doc(code, "t2", [5.0, 6.0]) for code in codes}
+
+        with patch.object(self.client, '_fetch_series_docs', side_effect=fake_docs) as mock_docs:
+            result = self.client.get_multi_series_aligned("IMF", "IFS", "Q", "US", ["A", "B"])
+
+        assert mock_docs.call_args_list[-1].args[2] == ["Q.US.B"]
+        assert result[0] == {"date": "2020-Q1", "A": 1.0, "B": 5.0}
+        assert self.store.indexed_at("IMF", "IFS", "Q.US.B") == "t2"
+
+    def test_check_bypasses_response_cache(self):
+        """Test that the indexed_at check is sent upstream even when a response is cached."""
+        self.store.write("IMF", "IFS", "Q.US.A", ["2020-Q1", "2020-Q2"], [1.0, 2.0], "t1")
+        response = Mock(status_code=200, content=json.dumps(
+            {"series": {"docs": [self._doc("Q.US.A", "t1")]}}
+        ).encode(), headers={})
+
+        with patch.object(self.client, '_get', return_value=response) as mock_get:
+            self.client._fetch_series_set("IMF", "IFS", ["Q.US.A"])
+            self.client._fetch_series_set("IMF", "IFS", ["Q.US.A"])
+
+        assert mock_get.call_count == 2
+
+    def test_stored_series_served_stale_when_upstream_down(self):
+        """Test that stored series outlive an outage past the check interval, flagged stale."""
+        self.store.write("IMF", "IFS", "Q.US.A", ["2020-Q1", "2020-Q2"], [1.0, 2.0], "t1")
+        self.store.write("IMF", "IFS", "Q.US.B", ["2020-Q1", "2020-Q2"], [3.0, 4.0])
+
+        with patch.object(self.client, '_get', side_effect=requests.ConnectionError("down")):
+            with self.client.track_staleness() as stale:
+                result = self.client._fetch_series_set("IMF", "IFS", ["Q.US.A", "Q.US.B"])
+            with pytest.raises(requests.ConnectionError):
+                self.client._fetch_series_set("IMF", "IFS", ["Q.US.A", "Q.US.C"])
+
+        assert result == {"Q.US.A": (["2020-Q1", "2020-Q2"], [1.0, 2.0]),
+                          "Q.US.B": (["2020-Q1", "2020-Q2"], [3.0, 4.0])}
+        assert len(stale) == 2 and stale[0].endswith("/series/IMF/IFS/Q.US.A")
+
+    def test_rate_limit_timeout_on_check_serves_stored_copy(self):
+        """Test that a rate-limited indexed_at check serves the stored series without retrying."""
+        self.store.write("IMF", "IFS", "Q.US.A", ["2020-Q1", "2020-Q2"], [1.0, 2.0], "t1")
+
+        with patch.object(self.client, '_fetch_series_docs', side_effect=RateLimitTimeout("queue full")) as mock_docs:
+            with self.client.track_staleness() as stale:
+                result = self.client._fetch_series_set("IMF", "IFS", ["Q.US.A"])
+
+        assert result["Q.US.A"] == (["2020-Q1", "2020-Q2"], [1.0, 2.0])
+        assert mock_docs.call_count == 1
+        assert len(stale) == 1
+
+
+class TestSingleFlight:
+    """Test cases for upstream request coalescing."""
+
+    def test_concurrent_sync_callers_share_one_call(self):
+        """Test that threads asking for the same key run the work once."""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(2)
+            return "metadata"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("k", work)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 2
+        while flight.stats()["coalesced"] < 4 and time.time() < deadline:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ["metadata"] * 5
+        assert flight.stats()["in_flight"] == 0
+
+    def test_async_callers_share_one_call(self):
+        """Test that coroutines asking for the same key await one call."""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def main():
+            return await asyncio.gather(*(flight.do_async("k", work) for _ in range(3)))
+
+        assert asyncio.run(main()) == [42, 42, 42]
+        assert calls == [1]
+
+    def test_errors_are_shared_and_not_cached(self):
+        """Test that a failed call propagates and the next call runs again."""
+        flight = SingleFlight()
+        with pytest.raises(ValueError):
+            flight.do("k", Mock(side_effect=ValueError("boom")))
+        assert flight.do("k", lambda: "ok") == "ok"
+
+
+class TestRateLimiter:
+    """Test cases for the upstream rate limiter and concurrency budget."""
+
+    def test_token_bucket_spaces_requests(self):
+        """Test that requests beyond the burst wait for tokens."""
+        limiter = RateLimiter(rate=50, burst=2, max_in_flight=4, timeout=1)
+        start = time.monotonic()
+        for _ in range(4):
+            with limiter.slot():
+                pass
+
+        assert time.monotonic() - start >= 0.035
+        assert limiter.stats()["acquired"] == 4
+        assert limiter.stats()["queue_wait_seconds"] > 0
+
+    def test_waits_until_deadline_then_times_out(self):
+        """Test that a full in-flight budget fails only after the deadline."""
+        limiter = RateLimiter(rate=0, max_in_flight=1)
+        with limiter.slot():
+            with pytest.raises(RateLimitTimeout):
+                with limiter.slot(timeout=0.01):
+                    pass
+
+        assert limiter.stats()["timeouts"] == 1
+        assert limiter.stats()["in_flight"] == 0
+
+    @patch('requests.Session.get')
+    def test_transport_requests_go_through_limiter(self, mock_get):
+        """Test that the transport takes a limiter slot per attempt."""
+        mock_get.return_value = Mock(status_code=200)
+        limiter = RateLimiter(rate=0)
+        transport = HTTPTransport(limiter=limiter)
+
+        transport.get("https://example.org")
+
+        assert transport.stats()["limiter"]["acquired"] == 1
+
+    @patch('requests.Session.get')
+    def test_streamed_response_holds_slot_until_closed(self, mock_get):
+        """Test that a streamed response keeps its upstream slot while the body downloads."""
+        mock_get.return_value = Mock(status_code=200)
+        close = mock_get.return_value.close
+        limiter = RateLimiter(rate=0, max_in_flight=1)
+        transport = HTTPTransport(limiter=limiter)
+
+        response = transport.get("https://example.org", stream=True)
+        assert limiter.stats()["in_flight"] == 1
+        with pytest.raises(RateLimitTimeout):
+            transport.get("https://example.org", queue_timeout=0.01)
+
+        response.close()
+        response.close()
+        assert limiter.stats()["in_flight"] == 0
+        assert close.call_count == 2
+
+    def test_background_requests_queue_longer(self):
+        """Test that refreshes pass the background queue timeout and callers the interactive one."""
+        client = DBNomicsClient(cache_ttls={"metadata": 60})
+        client.cache.set((f"{client.base_url}/datasets/IMF/IFS", ()), {"datasets": [{"code": "OLD"}]}, ttl=1)
+        response = Mock(status_code=200, content=b'{"datasets": {"docs": [{"code": "NEW"}]}}', headers={})
+
+        with patch.object(client.transport, 'get', return_value=response) as mock_get:
+            client.get_dataset_metadata("IMF", "IFS")
+            client._get_refresh_executor().shutdown(wait=True)
+            client.get_dataset_metadata("IMF", "WEO")
+
+        timeouts = [call.kwargs["queue_timeout"] for call in mock_get.call_args_list]
+        assert timeouts == [client.QUEUE_TIMEOUTS["background"], client.QUEUE_TIMEOUTS["interactive"]]
+
+
+class TestStaleWhileRevalidate:
+    """Test cases for the circuit breaker and stale fallbacks."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.client = DBNomicsClient(breaker=self.breaker, cache_ttls={"metadata": 60})
+        self.url = f"{self.client.base_url}/datasets/IMF/IFS"
+        self.key = (self.url, ())
+
+    def test_breaker_trips_after_repeated_failures(self):
+        """Test that the breaker opens and then rejects calls at once."""
+        with patch.object(self.client, '_get', side_effect=requests.ConnectionError("down")) as mock_get:
+            for _ in range(2):
+                with pytest.raises(requests.ConnectionError):
+                    self.client.get_dataset_metadata("IMF", "IFS")
+            with pytest.raises(CircuitOpenError):
+                self.client.get_dataset_metadata("IMF", "IFS")
+
+        assert mock_get.call_count == 2
+        assert self.breaker.state == CircuitBreaker.OPEN
+
+    def test_expired_copy_served_stale_when_upstream_fails(self):
+        """Test that an expired entry is served and flagged when DBnomics is down."""
+        self.client.cache.set(self.key, {"datasets": [{"code": "IFS"}]}, ttl=0, stale_ttl=60)
+
+        with patch.object(self.client, '_get', side_effect=requests.ConnectionError("down")), \
+             patch.object(self.client, '_schedule_refresh') as mock_refresh:
+            with self.client.track_staleness() as stale:
+                metadata = self.client.get_dataset_metadata("IMF", "IFS")
+
+        assert metadata == {"code": "IFS"}
+        assert stale == [self.url]
+        mock_refresh.assert_called_once()
+
+    def test_nearly_expired_entry_refreshed_in_background(self):
+        """Test that a hit close to expiry returns at once and schedules a refresh."""
+        self.client.cache.set(self.key, {"datasets": [{"code": "OLD"}]}, ttl=1)
+
+        with patch.object(self.client, '_schedule_refresh') as mock_refresh:
+            metadata = self.client.get_dataset_metadata("IMF", "IFS")
+
+        assert metadata == {"code": "OLD"}
+        mock_refresh.assert_called_once()
+
+    def test_refresh_runs_off_the_fetch_pool(self):
+        """Test that background refreshes use their own small pool."""
+        self.client.cache.set(self.key, {"datasets": [{"code": "OLD"}]}, ttl=1)
+        response = Mock(status_code=200, content=b'{"datasets": {"docs": [{"code": "NEW"}]}}', headers={})
+        threads = []
+
+        def fake_get(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return response
+
+        with patch.object(self.client, '_get', side_effect=fake_get):
+            self.client.get_dataset_metadata("IMF", "IFS")
+            self.client._get_refresh_executor().shutdown(wait=True)
+
+        assert threads and threads[0].startswith("dbnomics-refresh")
+        assert self.client._executor is None
+
+    def test_coalesced_callers_record_one_failure(self):
+        """Test that callers sharing one failed request count as a single breaker failure."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        client = DBNomicsClient(breaker=breaker)
+        release = threading.Event()
+
+        def failing_get(*args, **kwargs):
+            release.wait(2)
+            raise requests.ConnectionError("down")
+
+        errors = []
+
+        def call():
+            try:
+                client.get_dataset_metadata("IMF", "IFS")
+            except requests.ConnectionError as exc:
+                errors.append(exc)
+
+        with patch.object(client, '_get', side_effect=failing_get) as mock_get:
+            threads = [threading.Thread(target=call) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            deadline = time.time() + 2
+            while client.singleflight.stats()["coalesced"] < 5 and time.time() < deadline:
+                time.sleep(0.005)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        assert mock_get.call_count == 1
+        assert len(errors) == 6
+        assert breaker.stats()["consecutive_failures"] == 1
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_rate_limit_timeout_records_nothing(self):
+        """Test that a local queue timeout neither closes nor trips the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        client = DBNomicsClient(breaker=breaker)
+
+        with patch.object(client, '_get', side_effect=RateLimitTimeout("queue full")):
+            with pytest.raises(RateLimitTimeout):
+                client.get_dataset_metadata("IMF", "IFS")
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.stats()["consecutive_failures"] == 1
+
+    def test_half_open_probe_closes_breaker(self):
+        """Test that one successful probe after the reset timeout closes the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        assert breaker.allow() is False
+        time.sleep(0.06)
+
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestJSONDecoder:
+    """Test cases for the pluggable JSON decoder."""
+
+    BODY = (
+        b'{"series": {"num_found": 1, "docs": [{"series_code": "A.US.X", '
+        b'"dimensions": {"FREQ": "A"}, "period": ["2020"], "value": [1.5], '
+        b'"observations_attributes": [["NA"]]}]}, "dataset": {"code": "IFS"}}'
+    )
+
+    def test_backends_decode_alike(self):
+        """Test that every installed backend returns the same plain data."""
+        expected = json.loads(self.BODY)
+        for backend in ("json", "orjson", "msgspec"):
+            try:
+                decoder = JSONDecoder(backend)
+            except ImportError:
+                continue
+            data = decoder.decode(self.BODY)
+            assert data == expected
+
+    def test_typed_series_decode_drops_unused_fields(self):
+        """Test that series responses keep only the fields the client reads."""
+        pytest.importorskip("msgspec")
+        data = JSONDecoder("msgspec").decode(self.BODY, kind="series")
+
+        doc = data["series"]["docs"][0]
+        assert "dataset" not in data
+        assert "observations_attributes" not in doc
+        assert doc["period"] == ["2020"] and doc["value"] == [1.5]
+        assert data["series"]["num_found"] == 1
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            JSONDecoder("simdjson")
@@ -207,4 +207,55 @@ class TestMyPlot:
             assert isinstance(fig, go.Figure)
         except Exception as e:
             # Should handle None data gracefully
-            assert "none" in str(e).lower() or "data" in str(e).lower() 
\ No newline at end of file
+            assert "none" in str(e).lower() or "data" in str(e).lower() 
+
+
+class TestChartSpec:
+    """Test cases for the direct chart payload builder."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.sample_data = pd.DataFrame({
+            'NGDP_D_SA_IX': [100.0, np.nan, 102.0],
+            'NGDP_SA_XDC': [np.inf, 202.0, 204.0]
+        }, index=['2020-Q1', '2020-Q2', '2020-Q3'])
+
+    @pytest.mark.parametrize("theme", ["light", "dark"])
+    @pytest.mark.parametrize("chart", ["line", "bar", "Bar_PCT"])
+    def test_matches_plotly_payload(self, chart, theme):
+        """Test that the direct payload equals the one extracted from plot_ts."""
+        from openbb_dbnomics.utils.chartspec import chart_payload, figure_payload
+        from openbb_dbnomics.utils.myplot import plot_ts
+
+        cleaned = self.sample_data.replace([np.inf, -np.inf], np.nan)
+        cleaned = cleaned.where(pd.notnull(cleaned), None)
+        fig = plot_ts(cleaned, nome="GDP", units="Index", chart=chart, source="DBnomics", theme=theme)
+
+        expected = figure_payload(fig, nome="GDP", source="DBnomics", theme=theme)
+        payload = chart_payload(self.sample_data, nome="GDP", units="Index", chart=chart,
+                                source="DBnomics", theme=theme)
+        assert payload == expected
+
+    def test_nan_and_inf_masked(self):
+        """Test that non-finite values become None."""
+        from openbb_dbnomics.utils.chartspec import chart_payload
+
+        payload = chart_payload(self.sample_data, nome="GDP", units="Index")
+
+        assert payload["data"][0]["y"] == [100.0, None, 102.0]
+        assert payload["data"][1]["y"] == [None, 202.0, 204.0]
+        assert payload["data"][0]["x"] == ['2020-Q1', '2020-Q2', '2020-Q3']
+
+    def test_max_points_downsamples_each_trace(self):
+        """Test that max_points bounds every trace and keeps its own x values."""
+        from openbb_dbnomics.utils.chartspec import chart_payload
+
+        index = pd.date_range("2000-01-01", periods=5_000, freq="D").strftime("%Y-%m-%d")
+        df = pd.DataFrame({"A": np.sin(np.arange(5_000) / 50.0), "B": np.arange(5_000.0)}, index=index)
+
+        payload = chart_payload(df, nome="GDP", units="Index", max_points=100)
+
+        for trace in payload["data"]:
+            assert len(trace["x"]) == len(trace["y"]) <= 100
+            assert trace["x"][0] == "2000-01-01" and trace["x"][-1] == index[-1]
+        assert max(payload["data"][0]["y"]) == pytest.approx(df["A"].max())
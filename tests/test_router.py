@@ -1,5 +1,6 @@
 """Integration tests for FastAPI router endpoints."""
 
+import json
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch
@@ -67,6 +68,57 @@ class TestRouterEndpoints:
         assert data[0]["REF_AREA"] == "US"
         mock_client.get_series.assert_called_once()
 
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_pushes_filters_upstream(self, mock_client):
+        """Test that /series forwards dimension filters and paging to the client."""
+        mock_client.get_series.return_value = []
+
+        response = self.client.get(
+            '/series?provider=IMF&dataset=IFS&ref_area=US&limit=5&offset=10'
+            '&name_filter=gdp&dimensions={"FREQ":["Q"]}'
+        )
+
+        assert response.status_code == 200
+        mock_client.get_series.assert_called_once_with(
+            provider_code="IMF", dataset_code="IFS", limit=5, offset=10,
+            ref_area="US", dimensions={"FREQ": ["Q"]}, q="gdp"
+        )
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_invalid_dimensions(self, mock_client):
+        """Test that a malformed dimensions filter is rejected."""
+        response = self.client.get("/series?provider=IMF&dataset=IFS&dimensions=notjson")
+
+        assert response.status_code == 400
+        assert "error" in response.json()
+        mock_client.get_series.assert_not_called()
+
+    @patch('openbb_dbnomics.router.client')
+    def test_dimension_values_must_be_strings(self, mock_client):
+        """Test that dimension values other than a string or a list of strings are rejected."""
+        for filters in ('{"FREQ":1}', '{"FREQ":[1]}', '{"FREQ":{"Q":true}}', '{"FREQ":null}'):
+            for path in ("/series", "/series/facets"):
+                response = self.client.get(f"{path}?provider=IMF&dataset=IFS&dimensions={filters}")
+                assert response.status_code == 400
+
+        mock_client.get_series.assert_not_called()
+        mock_client.get_facet_index.assert_not_called()
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_cursor_pagination(self, mock_client):
+        """Test that cursor mode returns one page and a next cursor header."""
+        from openbb_dbnomics.utils.pagination import decode_cursor, encode_cursor
+        mock_client.iter_series.return_value = iter([{"series_code": "A"}, {"series_code": "B"}])
+
+        response = self.client.get(
+            f"/series?provider=IMF&dataset=IFS&page_size=2&cursor={encode_cursor(4)}"
+        )
+
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert decode_cursor(response.headers["X-Next-Cursor"]) == 6
+        assert mock_client.iter_series.call_args.kwargs["offset"] == 4
+
     @patch('openbb_dbnomics.router.client')
     def test_get_ref_areas(self, mock_client):
         """Test /series/ref_areas endpoint."""
@@ -104,6 +156,60 @@ class TestRouterEndpoints:
         assert data[0]["code"] == "NGDP_D_SA_IX"
         assert data[1]["code"] == "NGDP_SA_XDC"
 
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_ndjson(self, mock_client):
+        """Test /series streams one series per line when NDJSON is accepted."""
+        mock_client.iter_series.return_value = iter([
+            {"series_code": "Q.US.A", "REF_AREA": "US"},
+            {"series_code": "Q.FR.A", "REF_AREA": "FR"}
+        ])
+
+        response = self.client.get(
+            "/series?provider=IMF&dataset=IFS&limit=2", headers={"Accept": "application/x-ndjson"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["series_code"] for line in lines] == ["Q.US.A", "Q.FR.A"]
+        mock_client.get_series.assert_not_called()
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_datasets_ndjson(self, mock_client):
+        """Test /datasets streams one dataset per line when NDJSON is accepted."""
+        mock_client.iter_datasets.return_value = iter([{"code": "IFS"}, {"code": "WEO"}])
+
+        response = self.client.get("/datasets?search=gdp", headers={"Accept": "application/x-ndjson"})
+
+        assert response.status_code == 200
+        assert [json.loads(line)["code"] for line in response.text.splitlines()] == ["IFS", "WEO"]
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_facets(self, mock_client):
+        """Test /series/facets returns matches and labelled facet counts."""
+        from openbb_dbnomics.utils.facets import FacetIndex
+        from openbb_dbnomics.utils.listing import SeriesListing
+
+        mock_client.get_facet_index.return_value = FacetIndex(SeriesListing.from_records([
+            {"series_code": "Q.US.GDP", "REF_AREA": "US", "INDICATOR": "GDP"},
+            {"series_code": "Q.FR.GDP", "REF_AREA": "FR", "INDICATOR": "GDP"},
+            {"series_code": "Q.US.CPI", "REF_AREA": "US", "INDICATOR": "CPI"}
+        ]))
+        mock_client.get_dataset_metadata.return_value = {
+            "dimensions_values_labels": {"REF_AREA": {"US": "United States", "FR": "France"}}
+        }
+
+        response = self.client.get(
+            '/series/facets?provider=IMF&dataset=IFS&ref_area=US'
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 3 and data["count"] == 2
+        assert [s["series_code"] for s in data["series"]] == ["Q.US.GDP", "Q.US.CPI"]
+        assert data["facets"]["REF_AREA"][0] == {"code": "US", "name": "United States", "count": 2}
+        assert {f["code"]: f["count"] for f in data["facets"]["INDICATOR"]} == {"GDP": 1, "CPI": 1}
+
     @patch('openbb_dbnomics.router.client')
     def test_get_series_table(self, mock_client):
         """Test /series/table endpoint."""
@@ -131,6 +237,108 @@ class TestRouterEndpoints:
         assert "NGDP_D_SA_IX" in data[0]
         assert "NGDP_SA_XDC" in data[0]
 
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_table_with_change(self, mock_client):
+        """Test /series/table applies the change transform."""
+        mock_client.get_multi_series_aligned.return_value = [
+            {"date": "2020-Q1", "NGDP_D_SA_IX": 100.0},
+            {"date": "2020-Q2", "NGDP_D_SA_IX": 110.0}
+        ]
+
+        response = self.client.get(
+            "/series/table?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=NGDP_D_SA_IX&change=rebase"
+        )
+
+        assert response.status_code == 200
+        assert response.json()[1]["NGDP_D_SA_IX"] == pytest.approx(110.0)
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_table_missing_values(self, mock_client):
+        """Test /series/table returns None for missing and non-finite values."""
+        mock_client.get_multi_series_aligned.return_value = [
+            {"date": "2020-Q1", "A": 1.0, "B": float("nan")},
+            {"date": "2020-Q2", "A": float("inf"), "B": 2.0}
+        ]
+
+        response = self.client.get(
+            "/series/table?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A,B,C"
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"date": "2020-Q1", "A": 1.0, "B": None, "C": None},
+            {"date": "2020-Q2", "A": None, "B": 2.0, "C": None}
+        ]
+
+    def test_row_model_cached_per_indicator_set(self):
+        """Test that table row models are built once per indicator tuple."""
+        from openbb_dbnomics.router import _row_model
+
+        model = _row_model(("A", "B"))
+
+        assert _row_model(("A", "B")) is model
+        assert _row_model(("B", "A")) is not model
+        assert model.model_validate({"date": "2020-Q1", "A": None}).A is None
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_table_columns_format(self, mock_client):
+        """Test /series/table encodes the aligned frame by column."""
+        mock_client.get_multi_series_aligned.return_value = pd.DataFrame(
+            {"A": [1.0, float("nan")]}, index=pd.Index(["2020-Q1", "2020-Q2"], name="date")
+        )
+
+        response = self.client.get(
+            "/series/table?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A&format=columns"
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"date": ["2020-Q1", "2020-Q2"], "A": [1.0, None]}
+        assert mock_client.get_multi_series_aligned.call_args.kwargs["output"] == "frame"
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_chart_columns_follow_indicators(self, mock_client):
+        """Test that /series/chart data formats list every requested indicator, in order."""
+        mock_client.get_multi_series_aligned.return_value = pd.DataFrame(
+            {"A": [1.0, 2.0]}, index=pd.Index(["2020-Q1", "2020-Q2"], name="date")
+        )
+
+        response = self.client.get(
+            "/series/chart?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=B,A&format=columns"
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"date": ["2020-Q1", "2020-Q2"], "B": [None, None], "A": [1.0, 2.0]}
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_chart_max_points_needs_records(self, mock_client):
+        """Test that /series/chart refuses max_points with a data format instead of ignoring it."""
+        response = self.client.get(
+            "/series/chart?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A&format=columns&max_points=100"
+        )
+
+        assert response.status_code == 400
+        mock_client.get_multi_series_aligned.assert_not_called()
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_table_unknown_format(self, mock_client):
+        """Test /series/table rejects an unknown format."""
+        response = self.client.get(
+            "/series/table?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A&format=xml"
+        )
+
+        assert response.status_code == 400
+        mock_client.get_multi_series_aligned.assert_not_called()
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_table_unknown_change(self, mock_client):
+        """Test /series/table rejects an unknown change type."""
+        response = self.client.get(
+            "/series/table?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A&change=median"
+        )
+
+        assert response.status_code == 400
+        mock_client.get_multi_series_aligned.assert_not_called()
+
     @patch('openbb_dbnomics.router.client')
     @patch('openbb_dbnomics.router.plot_ts')
     def test_get_series_chart_success(self, mock_plot_ts, mock_client):
@@ -180,6 +388,47 @@ class TestRouterEndpoints:
         assert "error" in data
         assert "No data found" in data["error"]
 
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_chart_date_range_pushed_down(self, mock_client):
+        """Test that startdate/enddate are passed to the fetch, not filtered per row."""
+        mock_client.get_multi_series_aligned.return_value = []
+
+        self.client.get(
+            "/series/chart?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A"
+            "&startdate=2000-Q1&enddate=2010-Q4"
+        )
+
+        kwargs = mock_client.get_multi_series_aligned.call_args.kwargs
+        assert kwargs["start"] == "2000-Q1"
+        assert kwargs["end"] == "2010-Q4"
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_chart_invalid_enddate(self, mock_client):
+        """Test /series/chart rejects an unparsable enddate."""
+        response = self.client.get(
+            "/series/chart?provider=IMF&dataset=IFS&freq=Q&ref_area=US&indicators=A&enddate=soon"
+        )
+
+        assert response.status_code == 400
+        mock_client.get_multi_series_aligned.assert_not_called()
+
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_chart_max_points(self, mock_client):
+        """Test /series/chart downsamples long line traces to max_points."""
+        mock_client.get_multi_series_aligned.return_value = [
+            {"date": f"{2000 + i // 12}-{i % 12 + 1:02d}", "A": float(i % 37)} for i in range(600)
+        ]
+
+        response = self.client.get(
+            "/series/chart?provider=IMF&dataset=IFS&freq=M&ref_area=US&indicators=A"
+            "&startdate=2000-01&max_points=50"
+        )
+
+        assert response.status_code == 200
+        trace = response.json()["data"][0]
+        assert len(trace["y"]) <= 50
+        assert max(trace["y"]) == 36.0 and min(trace["y"]) == 0.0
+
     @patch('openbb_dbnomics.router.client')
     @patch('openbb_dbnomics.router.plot_ts')
     def test_get_series_chart_with_yoy_change(self, mock_plot_ts, mock_client):
@@ -253,6 +502,16 @@ class TestRouterEndpoints:
         # Check that title includes QoQ change
         assert "Quarter-on-Quarter" in data["layout"]["title"]["text"]
 
+    @patch('openbb_dbnomics.router.client')
+    def test_get_series_chart_rejects_annual_qoq(self, mock_client):
+        """Test that /series/chart returns 400 for quarter-on-quarter changes of annual data."""
+        response = self.client.get(
+            "/series/chart?provider=IMF&dataset=IFS&freq=A&ref_area=US&indicators=NGDP_D_SA_IX&change=qoq"
+        )
+
+        assert response.status_code == 400
+        mock_client.get_multi_series_aligned.assert_not_called()
+
     def test_apply_change_function(self):
         """Test apply_change function with different scenarios."""
         from openbb_dbnomics.router import apply_change